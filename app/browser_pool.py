@@ -0,0 +1,90 @@
+"""
+Pool de navegadores precalentados para reducir la latencia de arranque de cada scraping
+"""
+import threading
+from typing import Any, Callable, List, Optional
+
+from loguru import logger
+
+
+class BrowserPool:
+    """
+    Mantiene hasta ``size`` drivers ya lanzados y listos para usar.
+
+    Cada driver se entrega una sola vez (el scraper lo cierra al terminar, igual que
+    antes); al tomar uno se lanza otro en segundo plano para reponer el pool, de modo
+    que el costo de arrancar Chromium se solapa con el scraping en curso.
+    Con ``memory_governor``, no se lanzan drivers de reserva mientras la memoria
+    esté sobre el presupuesto (el próximo ``acquire`` vuelve a intentarlo).
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 1, memory_governor: Optional[Any] = None):
+        self.factory = factory
+        self.size = max(0, size)
+        self.memory_governor = memory_governor
+        self._idle: List[Any] = []
+        self._launching = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def prewarm(self, raise_errors: bool = False):
+        """
+        Lanza drivers hasta completar el pool (bloqueante; llamar desde un hilo)
+        
+        Args:
+            raise_errors: Propagar el error de lanzamiento en lugar de solo registrarlo
+        """
+        while True:
+            # Se mide fuera del lock: leer /proc no debe frenar a acquire()
+            if self.memory_governor is not None and self.memory_governor.over_budget():
+                logger.info("Memoria sobre el presupuesto: no se precalienta otro navegador por ahora")
+                return
+            with self._lock:
+                if self._closed or len(self._idle) + self._launching >= self.size:
+                    return
+                self._launching += 1
+            driver = None
+            try:
+                driver = self.factory()
+            except Exception as e:
+                logger.warning(f"No se pudo precalentar un navegador: {e}")
+                if raise_errors:
+                    raise
+                return
+            finally:
+                with self._lock:
+                    self._launching -= 1
+                    if driver is not None and not self._closed:
+                        self._idle.append(driver)
+                        driver = None
+                if driver is not None:
+                    self._quit(driver)
+
+    def acquire(self) -> Any:
+        """Devuelve un driver precalentado o, si no hay, lanza uno nuevo"""
+        with self._lock:
+            driver = self._idle.pop() if self._idle else None
+        if self.size:
+            # También con el pool vacío: una reposición salteada por memoria se retoma aquí
+            threading.Thread(target=self.prewarm, name="browser-prewarm", daemon=True).start()
+        if driver is None:
+            return self.factory()
+        return driver
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': self.size, 'idle': len(self._idle), 'launching': self._launching}
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
+
+    @staticmethod
+    def _quit(driver: Any):
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -0,0 +1,406 @@
+"""
+Coordinación entre varios nodos (p. ej. un cluster de Raspberry Pi) sobre una base SQLite compartida
+
+Cada nodo abre la misma base (un volumen compartido) y obtiene de ahí:
+- una cola de trabajos con leases: una URL la procesa un solo nodo y, si ese nodo
+  deja de latir, el trabajo vuelve a la cola;
+- token buckets por dominio, comunes a todo el cluster, para no superar entre todos
+  los nodos el ritmo que tolera cada marketplace;
+- latidos (heartbeats) de los nodos vivos.
+
+Los dominios se asignan a los nodos por afinidad (rendezvous hashing sobre los nodos
+vivos); un nodo sin trabajo propio toma trabajos ajenos que llevan un rato esperando.
+
+Los tiempos guardados son relojes de pared de cada nodo, así que los nodos deben estar
+sincronizados por NTP. Las diferencias de hasta ``clock_skew`` segundos se toleran: un
+lease o un latido se consideran vencidos recién pasado ese margen, y los token buckets
+nunca retroceden su marca de tiempo (un nodo adelantado no puede recargar tokens de más).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    active_jobs INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    batch_id TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    node_id TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, enqueued_at);
+CREATE INDEX IF NOT EXISTS jobs_by_batch ON jobs (batch_id, status);
+CREATE TABLE IF NOT EXISTS token_buckets (
+    domain TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def domain_key(url: str) -> str:
+    """Dominio usado para la afinidad y el rate limit (sin ``www.``)"""
+    domain = urlparse(url).netloc.lower()
+    return domain[4:] if domain.startswith('www.') else domain
+
+
+def parse_domain_rates(spec: str) -> Dict[str, float]:
+    """``"amazon.com=3,mercadolibre.com.ar=10"`` -> {dominio: trabajos por minuto}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        domain, _, rate = item.partition('=')
+        try:
+            rates[domain.strip().lower()] = float(rate)
+        except ValueError:
+            logger.warning(f"Rate de dominio inválido ignorado: '{item}'")
+    return rates
+
+
+class ClusterCoordinator:
+    """
+    Cola de trabajos, rate limits por dominio y latidos compartidos entre nodos.
+
+    Todas las operaciones son transacciones cortas sobre SQLite (``BEGIN IMMEDIATE``),
+    por lo que varios procesos pueden usar la misma base a la vez. Los métodos son
+    bloqueantes; desde código async se llaman con ``asyncio.to_thread``.
+    """
+
+    def __init__(self, db_path: str, node_id: Optional[str] = None, rate_per_minute: float = 6.0,
+                 burst: float = 2.0, domain_rates: Optional[Dict[str, float]] = None,
+                 lease_seconds: float = 120.0, heartbeat_interval: float = 15.0,
+                 steal_after: float = 30.0, max_attempts: int = 3, poll_interval: float = 1.0,
+                 clock_skew: float = 30.0):
+        self.db_path = db_path
+        self.node_id = node_id or socket.gethostname()
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1.0, burst)
+        self.domain_rates = domain_rates or {}
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.steal_after = steal_after
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        # Desfase de reloj tolerado entre nodos al decidir si un lease o un latido venció
+        self.clock_skew = max(0.0, clock_skew)
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+    @classmethod
+    def from_env(cls) -> Optional["ClusterCoordinator"]:
+        """Coordinador configurado por entorno, o None si CLUSTER_MODE no está activo"""
+        if os.getenv('CLUSTER_MODE', '0').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            db_path=os.getenv('CLUSTER_DB', '/app/cluster/cluster.db'),
+            node_id=os.getenv('CLUSTER_NODE_ID') or None,
+            rate_per_minute=float(os.getenv('CLUSTER_DOMAIN_RATE_PER_MIN', '6')),
+            burst=float(os.getenv('CLUSTER_DOMAIN_BURST', '2')),
+            domain_rates=parse_domain_rates(os.getenv('CLUSTER_DOMAIN_RATES', '')),
+            lease_seconds=float(os.getenv('CLUSTER_LEASE_SECONDS', '120')),
+            heartbeat_interval=float(os.getenv('CLUSTER_HEARTBEAT_SECONDS', '15')),
+            steal_after=float(os.getenv('CLUSTER_STEAL_AFTER_SECONDS', '30')),
+            clock_skew=float(os.getenv('CLUSTER_CLOCK_SKEW_SECONDS', '30')),
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+        finally:
+            db.close()
+
+    # --- NODOS ---
+
+    def heartbeat(self, active_jobs: int = 0):
+        """Registra al nodo como vivo y extiende el lease de sus trabajos en curso"""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO nodes (node_id, started_at, last_seen, active_jobs) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(node_id) DO UPDATE SET last_seen = excluded.last_seen, active_jobs = excluded.active_jobs",
+                (self.node_id, now, now, active_jobs)
+            )
+            db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE status = 'leased' AND node_id = ?",
+                (now + self.lease_seconds, self.node_id)
+            )
+
+    def leave(self):
+        """Da de baja al nodo y devuelve a la cola sus trabajos sin terminar"""
+        with self._transaction() as db:
+            db.execute("DELETE FROM nodes WHERE node_id = ?", (self.node_id,))
+            db.execute(
+                "UPDATE jobs SET status = 'queued', node_id = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND node_id = ?",
+                (time.time(), self.node_id)
+            )
+
+    def _live_nodes(self, db: sqlite3.Connection, now: float) -> List[str]:
+        rows = db.execute(
+            "SELECT node_id FROM nodes WHERE last_seen >= ? ORDER BY node_id",
+            (now - 3 * self.heartbeat_interval - self.clock_skew,)
+        ).fetchall()
+        nodes = [row['node_id'] for row in rows]
+        return nodes if self.node_id in nodes else nodes + [self.node_id]
+
+    @staticmethod
+    def owner(domain: str, nodes: List[str]) -> str:
+        """Nodo afín a un dominio (rendezvous hashing: estable mientras el nodo siga vivo)"""
+        return max(nodes, key=lambda node: hashlib.sha1(f"{node}|{domain}".encode('utf-8')).digest())
+
+    # --- COLA DE TRABAJOS ---
+
+    def enqueue(self, batch_id: str, jobs: List[Dict[str, Any]]):
+        """Encola trabajos (dicts serializables a JSON con al menos ``url``)"""
+        now = time.time()
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT INTO jobs (job_id, batch_id, domain, payload, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (f"{batch_id}:{i}", batch_id, domain_key(job['url']), json.dumps(job, ensure_ascii=False), now, now)
+                    for i, job in enumerate(jobs)
+                ]
+            )
+
+    def claim(self, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        Toma hasta ``limit`` trabajos: primero los de dominios afines a este nodo y, si no
+        hay, los ajenos que llevan más de ``steal_after`` segundos esperando. También
+        recupera trabajos cuyo lease venció (su nodo dejó de latir).
+        """
+        now = time.time()
+        claimed = []
+        with self._transaction() as db:
+            nodes = self._live_nodes(db, now)
+            candidates = db.execute(
+                "SELECT job_id, domain, payload, attempts, enqueued_at FROM jobs "
+                "WHERE status = 'queued' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY enqueued_at, job_id",
+                (now - self.clock_skew,)
+            ).fetchall()
+            affine = [row for row in candidates if self.owner(row['domain'], nodes) == self.node_id]
+            affine_ids = {row['job_id'] for row in affine}
+            stolen = [
+                row for row in candidates
+                if row['job_id'] not in affine_ids and now - row['enqueued_at'] >= self.steal_after
+            ]
+            for row in (affine + stolen)[:limit]:
+                if row['attempts'] >= self.max_attempts:
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE job_id = ?",
+                        (f"Abandonado tras {row['attempts']} intentos", now, row['job_id'])
+                    )
+                    continue
+                db.execute(
+                    "UPDATE jobs SET status = 'leased', node_id = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (self.node_id, now + self.lease_seconds, now, row['job_id'])
+                )
+                claimed.append({'job_id': row['job_id'], 'domain': row['domain'], **json.loads(row['payload'])})
+        return claimed
+
+    def complete(self, job_id: str, result: Any):
+        self._finish(job_id, 'done', result=json.dumps(result, ensure_ascii=False))
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, 'failed', error=error)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE job_id = ? AND node_id = ?",
+                (status, result, error, time.time(), job_id, self.node_id)
+            )
+
+    def batch_results(self, batch_id: str) -> Optional[List[Any]]:
+        """
+        Resultados del lote en orden de encolado, o None si quedan trabajos pendientes.
+        Un lote terminado se borra de la cola al leerlo.
+        """
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT status, result FROM jobs WHERE batch_id = ? ORDER BY rowid", (batch_id,)
+            ).fetchall()
+            if any(row['status'] not in ('done', 'failed') for row in rows):
+                return None
+            db.execute("DELETE FROM jobs WHERE batch_id = ?", (batch_id,))
+        return [json.loads(row['result']) if row['result'] else None for row in rows]
+
+    async def run_batch(self, jobs: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Encola un lote y espera a que los nodos del cluster (este incluido, vía
+        ``run_worker``) lo terminen. Devuelve un resultado por trabajo (None si falló).
+        """
+        batch_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.enqueue, batch_id, jobs)
+        logger.info(f"Cluster: lote {batch_id[:8]} con {len(jobs)} trabajos encolado")
+        while True:
+            results = await asyncio.to_thread(self.batch_results, batch_id)
+            if results is not None:
+                return results
+            await asyncio.sleep(self.poll_interval)
+
+    async def run_worker(self, handler: Callable[[Dict[str, Any]], Awaitable[Any]], concurrency: int = 1):
+        """
+        Bucle del nodo: late, toma trabajos de la cola y los procesa con ``handler``
+        (hasta ``concurrency`` a la vez). Corre hasta ser cancelado.
+        """
+        running: set = set()
+        last_beat = 0.0
+        logger.info(f"Cluster: nodo '{self.node_id}' uniéndose ({self.db_path})")
+        try:
+            while True:
+                if time.monotonic() - last_beat >= self.heartbeat_interval:
+                    await asyncio.to_thread(self.heartbeat, len(running))
+                    last_beat = time.monotonic()
+                free = concurrency - len(running)
+                if free > 0:
+                    for job in await asyncio.to_thread(self.claim, free):
+                        task = asyncio.create_task(self._process(job, handler))
+                        running.add(task)
+                        task.add_done_callback(running.discard)
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.to_thread(self.leave)
+
+    async def _process(self, job: Dict[str, Any], handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        try:
+            result = await handler(job)
+        except Exception as e:
+            logger.error(f"Cluster: trabajo {job['job_id']} falló: {e}")
+            await asyncio.to_thread(self.fail, job['job_id'], str(e))
+            return
+        await asyncio.to_thread(self.complete, job['job_id'], result)
+
+    # --- RATE LIMIT POR DOMINIO ---
+
+    def rate_for(self, domain: str) -> float:
+        """Trabajos por minuto permitidos en todo el cluster para un dominio"""
+        for suffix, rate in self.domain_rates.items():
+            if domain == suffix or domain.endswith('.' + suffix):
+                return rate
+        return self.rate_per_minute
+
+    def try_acquire_token(self, domain: str) -> Tuple[float, float]:
+        """
+        Consume un token del dominio
+
+        Returns:
+            (0 si lo obtuvo o los segundos a esperar, instante del bucket usado en la decisión)
+        """
+        rate = self.rate_for(domain) / 60
+        now = time.time()
+        if rate <= 0:
+            return 0.0, now
+        with self._transaction() as db:
+            row = db.execute("SELECT tokens, updated_at FROM token_buckets WHERE domain = ?", (domain,)).fetchone()
+            if row is None:
+                tokens = self.burst
+            else:
+                # La marca nunca retrocede: un reloj atrasado no recarga y uno adelantado
+                # solo recarga lo que avanzó desde la última marca, que ya es la suya
+                now = max(now, row['updated_at'])
+                tokens = min(self.burst, row['tokens'] + (now - row['updated_at']) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            db.execute(
+                "INSERT INTO token_buckets (domain, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(domain) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (domain, tokens, now)
+            )
+        return wait, now
+
+    async def acquire_token(self, url: str):
+        """Espera (sin bloquear el loop) hasta obtener un token para el dominio de ``url``"""
+        domain = domain_key(url)
+        waited = 0.0
+        while True:
+            wait, _ = await asyncio.to_thread(self.try_acquire_token, domain)
+            if not wait:
+                break
+            waited += wait
+            await asyncio.sleep(wait)
+        if waited:
+            logger.debug(f"Rate limit de {domain}: esperó {waited:.1f}s")
+
+    # --- ESTADO ---
+
+    def status(self) -> Dict[str, Any]:
+        """Nodos, cola, buckets y afinidad de los dominios con trabajo pendiente"""
+        now = time.time()
+        with self._transaction() as db:
+            live = self._live_nodes(db, now)
+            nodes = db.execute("SELECT node_id, started_at, last_seen, active_jobs FROM nodes ORDER BY node_id").fetchall()
+            queue = db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+            pending = db.execute(
+                "SELECT domain, COUNT(*) AS n FROM jobs WHERE status IN ('queued', 'leased') GROUP BY domain"
+            ).fetchall()
+            buckets = db.execute("SELECT domain, tokens, updated_at FROM token_buckets ORDER BY domain").fetchall()
+        return {
+            'enabled': True,
+            'node_id': self.node_id,
+            'nodes': [
+                {
+                    'node_id': row['node_id'],
+                    'live': row['node_id'] in live,
+                    'last_seen_s': round(now - row['last_seen'], 1),
+                    'active_jobs': row['active_jobs'],
+                }
+                for row in nodes
+            ],
+            'queue': {row['status']: row['n'] for row in queue},
+            'pending_by_domain': {
+                row['domain']: {'jobs': row['n'], 'owner': self.owner(row['domain'], live)} for row in pending
+            },
+            'token_buckets': {
+                row['domain']: {
+                    'tokens': round(min(
+                        self.burst,
+                        row['tokens'] + max(0.0, now - row['updated_at']) * self.rate_for(row['domain']) / 60
+                    ), 2),
+                    'rate_per_minute': self.rate_for(row['domain']),
+                }
+                for row in buckets
+            },
+        }
@@ -3,10 +3,13 @@ Módulo para interactuar con Google Drive y Google Sheets
 """
 import os
 import json
-from typing import List, Dict, Optional, Any
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Iterator, Tuple
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
 import gspread
+import requests
 from loguru import logger
 
 class GoogleDriveHandler:
@@ -17,6 +20,14 @@ class GoogleDriveHandler:
         'https://www.googleapis.com/auth/spreadsheets'
     ]
     
+    # Escritura por bloques de hojas de reseñas
+    WRITE_CHUNK_ROWS = int(os.getenv('SHEETS_WRITE_CHUNK_ROWS', '500'))
+    WRITE_CHUNK_BYTES = int(float(os.getenv('SHEETS_WRITE_CHUNK_MB', '2')) * 2**20)
+    WRITE_WORKERS = int(os.getenv('SHEETS_WRITE_WORKERS', '3'))
+    # Filas por ventana al leer la hoja de entrada en streaming
+    READ_WINDOW_ROWS = int(os.getenv('SHEETS_READ_WINDOW', '200'))
+    CHECKPOINT_DIR = os.getenv('SHEETS_CHECKPOINT_DIR', '/app/config/checkpoints')
+    
     def __init__(self, credentials_path: str = '/app/credentials/resenas_credentials.json'):
         """
         Inicializa el handler de Google Drive
@@ -85,6 +96,77 @@ class GoogleDriveHandler:
             logger.error(f"Error al leer planilla: {str(e)}")
             raise
     
+    def iter_spreadsheet_rows(
+        self,
+        spreadsheet_name: str,
+        sheet_name: str,
+        start_row: Optional[int] = None,
+        end_row: Optional[int] = None,
+        filters: Optional[Dict[str, str]] = None,
+        window: Optional[int] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Lee una hoja por ventanas de filas y entrega los registros a medida que llegan
+        
+        A diferencia de read_spreadsheet, no descarga la hoja completa: cada ventana
+        es una sola llamada a la API y el consumidor puede empezar a procesar antes
+        de que se haya leído el resto. La lectura termina al llegar a end_row, al
+        final de la grilla o a una ventana completamente vacía.
+        
+        Args:
+            spreadsheet_name: Nombre de la planilla
+            sheet_name: Nombre de la hoja
+            start_row: Primera fila de datos (1-based, por defecto 2)
+            end_row: Última fila a leer, inclusive (por defecto, fin de la hoja)
+            filters: {columna: texto}; solo se entregan filas cuya columna contiene el
+                texto (sin distinguir mayúsculas)
+            window: Filas por llamada (por defecto SHEETS_READ_WINDOW)
+            
+        Yields:
+            (número de fila, registro {encabezado: valor})
+        """
+        try:
+            logger.info(f"Leyendo planilla por ventanas: {spreadsheet_name} - Hoja: {sheet_name}")
+            
+            spreadsheet = self.gspread_client.open(spreadsheet_name)
+            worksheet = spreadsheet.worksheet(sheet_name)
+            
+            headers = worksheet.row_values(1)
+        
+        except gspread.exceptions.SpreadsheetNotFound:
+            logger.error(f"Planilla no encontrada: {spreadsheet_name}")
+            raise ValueError(f"Planilla '{spreadsheet_name}' no encontrada.")
+            
+        except gspread.exceptions.WorksheetNotFound:
+            logger.error(f"Hoja no encontrada: {sheet_name}")
+            raise ValueError(f"Hoja '{sheet_name}' no encontrada en la planilla '{spreadsheet_name}'")
+        
+        if not headers:
+            return
+        
+        last_column = self._column_number_to_letter(len(headers))
+        window = window or self.READ_WINDOW_ROWS
+        first = max(start_row or 2, 2)
+        last = min(end_row or worksheet.row_count, worksheet.row_count)
+        wanted = {k: str(v).strip().lower() for k, v in (filters or {}).items()}
+        read = 0
+        
+        while first <= last:
+            window_end = min(first + window - 1, last)
+            values = worksheet.get(f"A{first}:{last_column}{window_end}")
+            if not values:
+                break
+            
+            for offset, raw in enumerate(values):
+                record = {h: (raw[i] if i < len(raw) else '') for i, h in enumerate(headers)}
+                read += 1
+                if all(text in str(record.get(col, '')).lower() for col, text in wanted.items()):
+                    yield first + offset, record
+            
+            first = window_end + 1
+        
+        logger.info(f"Se leyeron {read} registros de {spreadsheet_name} - {sheet_name}")
+    
     def update_cell(
         self,
         spreadsheet_name: str,
@@ -139,49 +221,87 @@ class GoogleDriveHandler:
         self, 
         spreadsheet_name: str, 
         new_sheet_name: str, 
-        reviews: List[Dict[str, Any]]
+        reviews: List[Dict[str, Any]],
+        chunk_rows: Optional[int] = None,
+        resume: bool = True,
+        summary_rows: Optional[List[List[str]]] = None
     ) -> str:
         """
         Crea una nueva hoja para el producto y escribe las reseñas.
-        Columnas: A: Reseña, B: Rating, C: Fecha, D: Usuario, E: Titulo, F: Marketplace
+        Columnas: A: Reseña, B: Rating, C: Fecha, D: Usuario, E: Titulo, F: Marketplace,
+        G: Fecha ISO (si las reseñas fueron post-procesadas). El resumen del producto,
+        si se indica, sigue desde la columna H: etiquetas en el encabezado y valores en la
+        primera fila de reseñas, en la misma escritura y sin agregar filas, para que la
+        hoja se siga leyendo como tabla (``get_all_records``).
+        
+        Las filas se envían en bloques (por cantidad de filas y tamaño aproximado) y
+        se guarda un checkpoint local con la última fila confirmada. Si una escritura
+        anterior de las mismas reseñas quedó a medias, se retoma desde ese punto.
+        
+        Args:
+            spreadsheet_name: Planilla destino
+            new_sheet_name: Nombre de la hoja del producto
+            reviews: Reseñas a escribir
+            chunk_rows: Filas por bloque (por defecto SHEETS_WRITE_CHUNK_ROWS)
+            resume: Retomar desde el checkpoint si coincide con estas reseñas
+            summary_rows: Filas [etiqueta, valor] con el resumen del producto
         """
         try:
             spreadsheet = self.gspread_client.open(spreadsheet_name)
             
-            # 1. Gestionar la hoja (Crear o Limpiar)
+            # 1. Preparar los datos
+            headers = ['Reseña', 'Rating', 'Fecha', 'Usuario', 'Titulo', 'Marketplace', 'Fecha ISO']
+            rows_to_write = [headers] + [self._review_to_row(r) for r in reviews]
+            if summary_rows:
+                rows_to_write = self._merge_summary(rows_to_write, summary_rows)
+            width = max(len(row) for row in rows_to_write)
+            fingerprint = self._rows_fingerprint(rows_to_write)
+            
+            checkpoint = self._load_checkpoint(spreadsheet_name, new_sheet_name) if resume else None
+            if checkpoint and checkpoint.get('fingerprint') != fingerprint:
+                checkpoint = None
+            
+            # 2. Gestionar la hoja (Crear, Limpiar o Retomar)
             try:
                 worksheet = spreadsheet.worksheet(new_sheet_name)
-                logger.info(f"La hoja '{new_sheet_name}' ya existe. Limpiando contenido anterior.")
-                worksheet.clear()
+                if checkpoint:
+                    logger.info(f"Retomando escritura de '{new_sheet_name}' desde la fila {checkpoint['committed_rows'] + 1}")
+                else:
+                    logger.info(f"La hoja '{new_sheet_name}' ya existe. Limpiando contenido anterior.")
+                    worksheet.clear()
             except gspread.exceptions.WorksheetNotFound:
                 logger.info(f"Creando nueva hoja: {new_sheet_name}")
+                checkpoint = None
                 # Creamos hoja con suficientes filas
-                worksheet = spreadsheet.add_worksheet(title=new_sheet_name, rows=len(reviews)+20, cols=7)
-            
-            # 2. Preparar los datos
-            headers = ['Reseña', 'Rating', 'Fecha', 'Usuario', 'Titulo', 'Marketplace']
-            rows_to_write = [headers]
-            
-            for r in reviews:
-                row = [
-                    str(r.get('contenido', ''))[:4000], 
-                    str(r.get('rating', '') or ''),
-                    str(r.get('fecha', '') or ''),
-                    str(r.get('autor', '') or ''),
-                    str(r.get('titulo', '') or ''),
-                    str(r.get('marketplace', '') or '')
-                ]
-                rows_to_write.append(row)
-            
-            logger.info(f"Escribiendo {len(rows_to_write)} filas en la hoja '{new_sheet_name}'...")
-
-            # 3. Escribir datos usando Argumentos con Nombre
+                worksheet = spreadsheet.add_worksheet(title=new_sheet_name, rows=len(rows_to_write)+20, cols=max(7, width))
+            
+            # 3. Ajustar la grilla antes de escribir (Sheets rechaza rangos fuera de la grilla)
+            if worksheet.row_count < len(rows_to_write) or worksheet.col_count < width:
+                worksheet.resize(
+                    rows=max(worksheet.row_count, len(rows_to_write) + 20),
+                    cols=max(worksheet.col_count, width)
+                )
+            
+            committed = checkpoint['committed_rows'] if checkpoint else 0
+            logger.info(f"Escribiendo {len(rows_to_write) - committed} filas en la hoja '{new_sheet_name}'...")
+            
+            # 4. Escribir por bloques usando Argumentos con Nombre
             # IMPORTANTE: Usamos range_name y values para evitar errores de versión en gspread
-            worksheet.update(range_name='A1', values=rows_to_write)
+            for chunk in self._chunk_rows(rows_to_write[committed:], chunk_rows or self.WRITE_CHUNK_ROWS):
+                start_row = committed + 1
+                self._with_retries(
+                    lambda: worksheet.update(range_name=f'A{start_row}', values=chunk),
+                    f"filas {start_row}-{committed + len(chunk)} de '{new_sheet_name}'"
+                )
+                committed += len(chunk)
+                if committed < len(rows_to_write):
+                    self._save_checkpoint(spreadsheet_name, new_sheet_name, fingerprint, committed)
+            
+            self._clear_checkpoint(spreadsheet_name, new_sheet_name)
             
-            # 4. Formato visual básico
+            # 5. Formato visual básico (encabezado de reseñas y de resumen en una sola llamada)
             try:
-                worksheet.format('A1:F1', {'textFormat': {'bold': True}})
+                worksheet.format(f"A1:{self._column_number_to_letter(len(rows_to_write[0]))}1", {'textFormat': {'bold': True}})
             except Exception:
                 pass # Ignorar errores de formato si ocurren
 
@@ -191,6 +311,135 @@ class GoogleDriveHandler:
             logger.error(f"Error guardando reseñas en hoja nueva: {str(e)}")
             raise
     
+    def save_reviews_parallel(
+        self,
+        jobs: List[Tuple[str, str, List[Dict[str, Any]]]],
+        max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Escribe varias hojas de producto a la vez
+        
+        Args:
+            jobs: Tuplas (planilla, hoja, reseñas) o (planilla, hoja, reseñas, filas de resumen)
+            max_workers: Escrituras simultáneas (por defecto SHEETS_WRITE_WORKERS)
+            
+        Returns:
+            Un dict por trabajo con status 'success' o 'failed' (y error)
+        """
+        def write(job):
+            spreadsheet_name, sheet_name, reviews, *rest = job
+            try:
+                self.save_reviews_to_new_sheet(
+                    spreadsheet_name, sheet_name, reviews, summary_rows=rest[0] if rest else None
+                )
+                return {'spreadsheet_name': spreadsheet_name, 'sheet_name': sheet_name, 'status': 'success'}
+            except Exception as e:
+                return {'spreadsheet_name': spreadsheet_name, 'sheet_name': sheet_name, 'status': 'failed', 'error': str(e)}
+        
+        workers = max(1, min(max_workers or self.WRITE_WORKERS, len(jobs)))
+        if workers == 1:
+            return [write(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(write, jobs))
+    
+    @staticmethod
+    def _review_to_row(r: Dict[str, Any]) -> List[str]:
+        return [
+            str(r.get('contenido', ''))[:4000], 
+            str(r.get('rating', '') or ''),
+            str(r.get('fecha', '') or ''),
+            str(r.get('autor', '') or ''),
+            str(r.get('titulo', '') or ''),
+            str(r.get('marketplace', '') or ''),
+            str(r.get('fecha_iso', '') or '')
+        ]
+    
+    @staticmethod
+    def _merge_summary(rows: List[List[str]], summary_rows: List[List[str]]) -> List[List[str]]:
+        """
+        Agrega el resumen como columnas a continuación de las reseñas: etiquetas en el
+        encabezado y valores en la primera fila de datos. Sin filas de reseñas no hay resumen.
+        """
+        if len(rows) < 2:
+            return rows
+        merged = [list(row) for row in rows]
+        merged[0] += [label for label, _ in summary_rows]
+        merged[1] += [value for _, value in summary_rows]
+        return merged
+    
+    def _chunk_rows(self, rows: List[List[str]], max_rows: int) -> Iterator[List[List[str]]]:
+        """Parte las filas en bloques de a lo sumo max_rows filas y WRITE_CHUNK_BYTES bytes"""
+        chunk, size = [], 0
+        for row in rows:
+            row_size = sum(len(cell.encode('utf-8')) for cell in row) + 8 * len(row)
+            if chunk and (len(chunk) >= max_rows or size + row_size > self.WRITE_CHUNK_BYTES):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(row)
+            size += row_size
+        if chunk:
+            yield chunk
+    
+    def _with_retries(self, operation, description: str, attempts: int = 4):
+        """Reintenta errores transitorios de la API (429/5xx, red) con backoff exponencial"""
+        for attempt in range(1, attempts + 1):
+            try:
+                return operation()
+            except gspread.exceptions.APIError as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if attempt == attempts or (status is not None and status != 429 and status < 500):
+                    raise
+                error = e
+            except (ConnectionError, TimeoutError, requests.exceptions.RequestException) as e:
+                if attempt == attempts:
+                    raise
+                error = e
+            wait = 2 ** attempt
+            logger.warning(f"Error escribiendo {description} ({error}); reintento {attempt}/{attempts - 1} en {wait}s")
+            time.sleep(wait)
+    
+    @staticmethod
+    def _rows_fingerprint(rows: List[List[str]]) -> str:
+        digest = hashlib.sha1()
+        for row in rows:
+            digest.update('\x1f'.join(row).encode('utf-8'))
+            digest.update(b'\x1e')
+        return digest.hexdigest()
+    
+    def _checkpoint_path(self, spreadsheet_name: str, sheet_name: str) -> str:
+        key = hashlib.sha1(f"{spreadsheet_name}\x1f{sheet_name}".encode('utf-8')).hexdigest()
+        return os.path.join(self.CHECKPOINT_DIR, f"{key}.json")
+    
+    def _load_checkpoint(self, spreadsheet_name: str, sheet_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._checkpoint_path(spreadsheet_name, sheet_name), encoding='utf-8') as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+    
+    def _save_checkpoint(self, spreadsheet_name: str, sheet_name: str, fingerprint: str, committed_rows: int):
+        path = self._checkpoint_path(spreadsheet_name, sheet_name)
+        try:
+            os.makedirs(self.CHECKPOINT_DIR, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as fh:
+                json.dump({
+                    'spreadsheet_name': spreadsheet_name,
+                    'sheet_name': sheet_name,
+                    'fingerprint': fingerprint,
+                    'committed_rows': committed_rows
+                }, fh)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Sin checkpoint la escritura sigue funcionando, solo no se puede retomar
+            logger.warning(f"No se pudo guardar checkpoint de '{sheet_name}': {e}")
+    
+    def _clear_checkpoint(self, spreadsheet_name: str, sheet_name: str):
+        try:
+            os.remove(self._checkpoint_path(spreadsheet_name, sheet_name))
+        except OSError:
+            pass
+    
     @staticmethod
     def _column_number_to_letter(n: int) -> str:
         """
@@ -2,14 +2,29 @@
 Aplicación principal para scraping de reseñas de marketplace
 """
 from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import Optional
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Dict, List, Literal, Optional, TYPE_CHECKING
+from contextlib import asynccontextmanager, nullcontext
+import asyncio
+import importlib
 import logging
+import os
+import threading
 from loguru import logger
 import sys
 
-from app.scraper import ReviewScraper
-from app.google_drive_handler import GoogleDriveHandler
+from app.review_cache import ReviewCache
+from app.memory_governor import MemoryGovernor
+from app.cluster import ClusterCoordinator
+from app.profiling import SamplingProfiler
+
+# Selenium, BeautifulSoup y las librerías de Google se importan en diferido
+# (ver prewarm) para que la API responda /health apenas arranca el proceso
+if TYPE_CHECKING:
+    from app.browser_pool import BrowserPool
+    from app.google_drive_handler import GoogleDriveHandler
+    from app.scraper import ReviewScraper
 
 # Configurar logger
 logger.remove()
@@ -25,10 +40,98 @@ logger.add(
     level="DEBUG"
 )
 
+# Navegadores lanzados por adelantado al iniciar (0 = desactivado)
+PREWARM_DRIVERS = int(os.getenv('PREWARM_DRIVERS', '1'))
+
+# Carpeta de los perfiles de tareas con profile=true
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/app/logs/profiles')
+
+# Estado del precalentamiento, visible en /health
+warmup_status = {"modules": "pending", "sheets": "pending", "browsers": "pending"}
+
+_drive_handler: Optional["GoogleDriveHandler"] = None
+_drive_handler_lock = threading.Lock()
+browser_pool: Optional["BrowserPool"] = None
+_browser_pool_lock = threading.Lock()
+
+def get_drive_handler() -> "GoogleDriveHandler":
+    """
+    Sesión de Google Sheets compartida por todas las tareas (se autentica una sola vez)
+    """
+    global _drive_handler
+    with _drive_handler_lock:
+        if _drive_handler is None:
+            from app.google_drive_handler import GoogleDriveHandler
+            _drive_handler = GoogleDriveHandler()
+        return _drive_handler
+
+def get_browser_pool() -> "BrowserPool":
+    """
+    Pool de navegadores precalentados compartido por todas las tareas
+    """
+    global browser_pool
+    with _browser_pool_lock:
+        if browser_pool is None:
+            from app.browser_pool import BrowserPool
+            from app.scraper import ReviewScraper
+            browser_pool = BrowserPool(
+                ReviewScraper.launch_driver, size=PREWARM_DRIVERS, memory_governor=memory_governor
+            )
+        return browser_pool
+
+async def prewarm():
+    """
+    Precalienta en background los módulos pesados, la sesión de Sheets y los navegadores
+    """
+    steps = [
+        ("modules", lambda: importlib.import_module("app.scraper")),
+        ("sheets", get_drive_handler),
+        ("browsers", lambda: get_browser_pool().prewarm(raise_errors=True)),
+    ]
+    for name, step in steps:
+        try:
+            await asyncio.to_thread(step)
+            warmup_status[name] = "ready"
+        except Exception as e:
+            logger.warning(f"Precalentamiento '{name}' falló: {str(e)}")
+            warmup_status[name] = f"failed: {str(e)}"
+    logger.info(f"Precalentamiento terminado: {warmup_status}")
+
+# Límite por dominio común a todos los trabajos del cluster que procesa este nodo
+cluster_domain_slots: Dict[str, asyncio.Semaphore] = {}
+
+async def process_cluster_job(job: dict) -> list:
+    """
+    Procesa un trabajo tomado de la cola del cluster (una URL y las filas que la piden)
+    """
+    drive_handler = await asyncio.to_thread(get_drive_handler)
+    scraper = await build_scraper(
+        drive_handler, cache_max_age=job.get('cache_max_age'), profile=job.get('profile', False),
+        domain_slots=cluster_domain_slots
+    )
+    return await scraper._run_shared_job(job)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup_task = asyncio.create_task(prewarm())
+    cluster_task = None
+    if cluster is not None:
+        cluster_task = asyncio.create_task(
+            cluster.run_worker(process_cluster_job, concurrency=int(os.getenv('MAX_WORKERS', '3')))
+        )
+    yield
+    warmup_task.cancel()
+    if cluster_task is not None:
+        cluster_task.cancel()
+        await asyncio.gather(cluster_task, return_exceptions=True)
+    if browser_pool is not None:
+        browser_pool.close()
+
 app = FastAPI(
     title="Marketplace Reviews Scraper API",
     description="API para extraer reseñas de productos de marketplace y guardarlas en Google Drive",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 class ScrapingRequest(BaseModel):
@@ -36,6 +139,49 @@ class ScrapingRequest(BaseModel):
     spreadsheet_name: str
     sheet_name: str
     drive_folder_id: Optional[str] = None
+    # Antigüedad máxima (segundos) de un resultado cacheado para reutilizarlo; 0 = siempre scrapear
+    cache_max_age: Optional[int] = Field(default=None, ge=0)
+    # Rango de filas (1-based, inclusive; la fila 1 son los encabezados) y filtros {columna: texto}
+    start_row: Optional[int] = Field(default=None, ge=2)
+    end_row: Optional[int] = Field(default=None, ge=2)
+    filters: Optional[Dict[str, str]] = None
+    # Re-scrapear aunque ARCHIVOJSON indique un resultado reciente con la misma huella
+    force: bool = False
+    # Antigüedad máxima (horas) de un estado OK para saltar la fila (por defecto SKIP_MAX_AGE_HOURS)
+    skip_max_age_hours: Optional[float] = Field(default=None, ge=0)
+    # Perfilar la tarea (muestreo de pilas + comandos WebDriver por producto)
+    profile: bool = False
+
+    @model_validator(mode='after')
+    def check_row_range(self):
+        if self.start_row and self.end_row and self.end_row < self.start_row:
+            raise ValueError("end_row debe ser mayor o igual que start_row")
+        return self
+
+class BulkTarget(BaseModel):
+    """Planilla/hoja de un scraping masivo (las opciones van en BulkScrapingRequest)"""
+    model_config = ConfigDict(extra='forbid')
+
+    spreadsheet_name: str
+    sheet_name: str
+    start_row: Optional[int] = Field(default=None, ge=2)
+    end_row: Optional[int] = Field(default=None, ge=2)
+    filters: Optional[Dict[str, str]] = None
+
+    @model_validator(mode='after')
+    def check_row_range(self):
+        if self.start_row and self.end_row and self.end_row < self.start_row:
+            raise ValueError("end_row debe ser mayor o igual que start_row")
+        return self
+
+class BulkScrapingRequest(BaseModel):
+    """Modelo de datos para el scraping de varias planillas/hojas en un solo pipeline"""
+    items: List[BulkTarget] = Field(..., min_length=1)
+    drive_folder_id: Optional[str] = None
+    cache_max_age: Optional[int] = Field(default=None, ge=0)
+    force: bool = False
+    skip_max_age_hours: Optional[float] = Field(default=None, ge=0)
+    profile: bool = False
 
 class ScrapingResponse(BaseModel):
     """Modelo de respuesta del scraping"""
@@ -48,6 +194,36 @@ class ScrapingResponse(BaseModel):
 # Almacenamiento temporal de tareas
 tasks_status = {}
 
+# Cache de reseñas compartido entre todas las tareas del proceso
+review_cache = ReviewCache.from_env()
+
+# Presupuesto de memoria (app + navegadores) compartido por todas las tareas
+memory_governor = MemoryGovernor.from_env()
+
+# Coordinación entre nodos (CLUSTER_MODE); None si el nodo trabaja solo
+cluster = ClusterCoordinator.from_env()
+
+async def build_scraper(drive_handler: "GoogleDriveHandler", cache_max_age: Optional[int] = None,
+                        skip_max_age_hours: Optional[float] = None, force: bool = False,
+                        profile: bool = False,
+                        domain_slots: Optional[Dict[str, asyncio.Semaphore]] = None) -> "ReviewScraper":
+    """
+    Crea un ReviewScraper con el cache, el pool y el cluster compartidos y las opciones de la solicitud
+    """
+    module = await asyncio.to_thread(importlib.import_module, "app.scraper")
+    return module.ReviewScraper(
+        drive_handler,
+        cache=review_cache,
+        cache_max_age=cache_max_age,
+        skip_max_age_hours=skip_max_age_hours,
+        force=force,
+        browser_pool=get_browser_pool() if PREWARM_DRIVERS > 0 else None,
+        memory_governor=memory_governor,
+        cluster=cluster,
+        profile=profile,
+        domain_slots=domain_slots
+    )
+
 @app.get("/")
 async def root():
     """Endpoint raíz"""
@@ -60,7 +236,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {"status": "healthy", "warmup": warmup_status}
 
 @app.post("/scrape", response_model=ScrapingResponse)
 async def scrape_reviews(
@@ -81,8 +257,14 @@ async def scrape_reviews(
         logger.info(f"Recibida solicitud de scraping para: {request.spreadsheet_name} - {request.sheet_name}")
         
         # Inicializar handlers
-        drive_handler = GoogleDriveHandler()
-        scraper = ReviewScraper(drive_handler)
+        drive_handler = await asyncio.to_thread(get_drive_handler)
+        scraper = await build_scraper(
+            drive_handler,
+            cache_max_age=request.cache_max_age,
+            skip_max_age_hours=request.skip_max_age_hours,
+            force=request.force,
+            profile=request.profile
+        )
         
         # Generar task_id
         import uuid
@@ -96,8 +278,12 @@ async def scrape_reviews(
             spreadsheet_name=request.spreadsheet_name,
             sheet_name=request.sheet_name,
             drive_folder_id=request.drive_folder_id,
+            start_row=request.start_row,
+            end_row=request.end_row,
+            filters=request.filters,
             scraper=scraper,
-            drive_handler=drive_handler
+            drive_handler=drive_handler,
+            profile=request.profile
         )
         
         return ScrapingResponse(
@@ -115,8 +301,12 @@ async def process_scraping(
     spreadsheet_name: str,
     sheet_name: str,
     drive_folder_id: Optional[str],
-    scraper: ReviewScraper,
-    drive_handler: GoogleDriveHandler
+    scraper: "ReviewScraper",
+    drive_handler: "GoogleDriveHandler",
+    start_row: Optional[int] = None,
+    end_row: Optional[int] = None,
+    filters: Optional[Dict[str, str]] = None,
+    profile: bool = False
 ):
     """
     Procesa el scraping en background
@@ -125,17 +315,25 @@ async def process_scraping(
         logger.info(f"Iniciando proceso de scraping [Task ID: {task_id}]")
         
         # Ejecutar scraping
-        result = await scraper.scrape_from_spreadsheet(
-            spreadsheet_name=spreadsheet_name,
-            sheet_name=sheet_name,
-            drive_folder_id=drive_folder_id
-        )
+        profiler = SamplingProfiler.from_env() if profile else None
+        with profiler or nullcontext():
+            result = await scraper.scrape_from_spreadsheet(
+                spreadsheet_name=spreadsheet_name,
+                sheet_name=sheet_name,
+                drive_folder_id=drive_folder_id,
+                start_row=start_row,
+                end_row=end_row,
+                filters=filters
+            )
+        if profiler is not None:
+            result['profile'] = await asyncio.to_thread(profiler.write, PROFILE_DIR, task_id)
         
         # Actualizar estado
         tasks_status[task_id] = {
             "status": "completed",
             "progress": 100,
-            "result": result
+            "result": result,
+            "memory": memory_governor.usage()
         }
         
         logger.info(f"Scraping completado exitosamente [Task ID: {task_id}]")
@@ -147,6 +345,97 @@ async def process_scraping(
             "error": str(e)
         }
 
+@app.post("/scrape/bulk", response_model=ScrapingResponse)
+async def scrape_reviews_bulk(
+    request: BulkScrapingRequest,
+    background_tasks: BackgroundTasks
+):
+    """
+    Inicia el scraping de varias planillas/hojas con un único scraper compartido
+    
+    Las URLs repetidas entre hojas se scrapean una sola vez y el resultado
+    se escribe en cada hoja que las contiene.
+    
+    Args:
+        request: BulkScrapingRequest con la lista de planillas y hojas
+        background_tasks: Gestor de tareas en background
+        
+    Returns:
+        ScrapingResponse con el estado del proceso
+    """
+    try:
+        logger.info(f"Recibida solicitud de scraping masivo para {len(request.items)} hojas")
+        
+        drive_handler = await asyncio.to_thread(get_drive_handler)
+        scraper = await build_scraper(
+            drive_handler,
+            cache_max_age=request.cache_max_age,
+            skip_max_age_hours=request.skip_max_age_hours,
+            force=request.force,
+            profile=request.profile
+        )
+        
+        import uuid
+        task_id = str(uuid.uuid4())
+        tasks_status[task_id] = {"status": "processing", "progress": 0}
+        
+        background_tasks.add_task(
+            process_bulk_scraping,
+            task_id=task_id,
+            targets=[item.model_dump() for item in request.items],
+            drive_folder_id=request.drive_folder_id,
+            scraper=scraper,
+            profile=request.profile
+        )
+        
+        return ScrapingResponse(
+            status="accepted",
+            message=f"Proceso de scraping masivo iniciado ({len(request.items)} hojas)",
+            task_id=task_id
+        )
+        
+    except Exception as e:
+        logger.error(f"Error al iniciar scraping masivo: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def process_bulk_scraping(
+    task_id: str,
+    targets: List[dict],
+    drive_folder_id: Optional[str],
+    scraper: "ReviewScraper",
+    profile: bool = False
+):
+    """
+    Procesa el scraping masivo en background
+    """
+    try:
+        logger.info(f"Iniciando scraping masivo [Task ID: {task_id}]")
+        
+        profiler = SamplingProfiler.from_env() if profile else None
+        with profiler or nullcontext():
+            result = await scraper.scrape_from_spreadsheets(
+                targets=targets,
+                drive_folder_id=drive_folder_id
+            )
+        if profiler is not None:
+            result['profile'] = await asyncio.to_thread(profiler.write, PROFILE_DIR, task_id)
+        
+        tasks_status[task_id] = {
+            "status": "completed",
+            "progress": 100,
+            "result": result,
+            "memory": memory_governor.usage()
+        }
+        
+        logger.info(f"Scraping masivo completado [Task ID: {task_id}]")
+        
+    except Exception as e:
+        logger.error(f"Error en scraping masivo [Task ID: {task_id}]: {str(e)}")
+        tasks_status[task_id] = {
+            "status": "failed",
+            "error": str(e)
+        }
+
 @app.get("/task/{task_id}")
 async def get_task_status(task_id: str):
     """
@@ -161,7 +450,49 @@ async def get_task_status(task_id: str):
     if task_id not in tasks_status:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    return tasks_status[task_id]
+    status = tasks_status[task_id]
+    if status.get("status") == "processing":
+        # Uso de memoria actual y límites, para ver si la tarea está siendo frenada
+        return {**status, "memory": memory_governor.usage()}
+    return status
+
+@app.get("/task/{task_id}/profile")
+async def get_task_profile(task_id: str, format: Literal["speedscope", "collapsed"] = "speedscope"):
+    """
+    Descarga el perfil de una tarea lanzada con profile=true
+    
+    Args:
+        task_id: ID de la tarea
+        format: "speedscope" (abrir en https://www.speedscope.app) o "collapsed" (flamegraph.pl)
+    """
+    profile = (tasks_status.get(task_id, {}).get("result") or {}).get("profile")
+    if not profile or not os.path.exists(profile[format]):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(profile[format], filename=os.path.basename(profile[format]))
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Estadísticas del cache de reseñas (hits, coalescencias, evicciones, tamaño)
+    """
+    return review_cache.stats()
+
+@app.delete("/cache")
+async def clear_cache():
+    """
+    Vacía el cache de reseñas
+    """
+    review_cache.clear()
+    return {"status": "success", "message": "Cache vaciado"}
+
+@app.get("/cluster/status")
+async def get_cluster_status():
+    """
+    Nodos vivos, estado de la cola compartida, afinidad de dominios y token buckets
+    """
+    if cluster is None:
+        return {"enabled": False}
+    return await asyncio.to_thread(cluster.status)
 
 @app.post("/test-connection")
 async def test_connection():
@@ -169,7 +500,7 @@ async def test_connection():
     Prueba la conexión con Google Drive
     """
     try:
-        drive_handler = GoogleDriveHandler()
+        drive_handler = await asyncio.to_thread(get_drive_handler)
         result = drive_handler.test_connection()
         return {"status": "success", "message": "Conexión exitosa con Google Drive", "details": result}
     except Exception as e:
@@ -0,0 +1,135 @@
+"""
+Control de memoria: mide la memoria de la app y sus navegadores y frena la concurrencia si se pasa del presupuesto
+"""
+import asyncio
+import gc
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+
+def _read_pss(pid: int) -> Optional[int]:
+    """PSS del proceso en bytes (``/proc/<pid>/smaps_rollup``), o None si no se puede leer"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            for line in fh:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+def process_tree_rss(root_pid: int, proportional: bool = False) -> Tuple[int, int]:
+    """
+    (memoria del proceso, memoria del proceso + descendientes) en bytes, leyendo /proc
+
+    Por defecto es RSS. Con ``proportional`` se usa el PSS: las páginas compartidas
+    entre procesos (los renderers, GPU y zygote de Chromium comparten la mayoría) se
+    reparten entre ellos en lugar de contarse una vez por proceso, así que la suma
+    refleja la memoria realmente ocupada. Si ``smaps_rollup`` no está disponible
+    (kernel < 4.14) o no se puede leer, ese proceso cuenta con su RSS.
+    """
+    children = defaultdict(list)
+    rss = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return 0, 0
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as fh:
+                fields = fh.read().rsplit(')', 1)[1].split()
+            pid = int(entry)
+            children[int(fields[1])].append(pid)
+            rss[pid] = int(fields[21]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    own = total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        if pid not in rss:
+            continue
+        memory = _read_pss(pid) if proportional else None
+        memory = rss[pid] if memory is None else memory
+        if pid == root_pid:
+            own = memory
+        total += memory
+        stack.extend(children.get(pid, []))
+    return own, total
+
+
+class MemoryGovernor:
+    """
+    Presupuesto de memoria compartido por todas las sesiones de navegador del proceso.
+
+    Antes de abrir un navegador se mide el PSS del proceso y de sus hijos
+    (chromedriver/Chromium); donde no hay ``smaps_rollup``, el RSS, que sobreestima
+    al contar varias veces las páginas compartidas. Si supera el presupuesto y ya hay
+    otra sesión activa, la nueva espera a que baje; una sesión siempre puede avanzar,
+    para no bloquearse.
+    """
+
+    def __init__(self, budget_mb: float = 0, poll_interval: float = 2.0, max_wait: float = 600):
+        self.budget_bytes = int(budget_mb * 2**20)
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.active = 0
+        self.throttled = 0
+        self.peak_bytes = 0
+        self.metric = 'pss' if _read_pss(os.getpid()) is not None else 'rss'
+
+    @classmethod
+    def from_env(cls) -> "MemoryGovernor":
+        return cls(budget_mb=float(os.getenv('MEMORY_BUDGET_MB', '2048')))
+
+    def _measure(self) -> Tuple[int, int]:
+        own, tree = process_tree_rss(os.getpid(), proportional=self.metric == 'pss')
+        self.peak_bytes = max(self.peak_bytes, tree)
+        return own, tree
+
+    def over_budget(self) -> bool:
+        return bool(self.budget_bytes) and self._measure()[1] > self.budget_bytes
+
+    def usage(self) -> Dict[str, Any]:
+        own, tree = self._measure()
+        return {
+            'metric': self.metric,
+            'used_mb': round(tree / 2**20, 1),
+            'app_mb': round(own / 2**20, 1),
+            'browsers_mb': round((tree - own) / 2**20, 1),
+            'peak_mb': round(self.peak_bytes / 2**20, 1),
+            'budget_mb': round(self.budget_bytes / 2**20, 1) if self.budget_bytes else None,
+            'over_budget': bool(self.budget_bytes) and tree > self.budget_bytes,
+            'active_sessions': self.active,
+            'throttled': self.throttled,
+        }
+
+    @asynccontextmanager
+    async def slot(self):
+        """Espera presupuesto (si hay otras sesiones activas) y libera memoria al salir"""
+        start = time.monotonic()
+        waited = False
+        while self.active > 0 and self.over_budget() and time.monotonic() - start < self.max_wait:
+            if not waited:
+                waited = True
+                self.throttled += 1
+                logger.warning(
+                    f"Memoria sobre el presupuesto ({self.usage()['used_mb']} MB {self.metric.upper()} > "
+                    f"{self.budget_bytes / 2**20:.0f} MB): esperando a que terminen {self.active} sesiones"
+                )
+            await asyncio.sleep(self.poll_interval)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            gc.collect()
@@ -0,0 +1,167 @@
+"""
+Perfilado opcional por tarea: muestreo de pilas de todos los hilos y conteo de llamadas a WebDriver
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+# Un frame: (función, archivo abreviado, línea de inicio de la función)
+Frame = Tuple[str, str, int]
+
+
+def _short_path(filename: str) -> str:
+    """Ruta relativa al paquete (``app/scraper.py``, ``selenium/webdriver/...``)"""
+    parts = filename.replace('\\', '/').split('/')
+    for anchor in ('site-packages', 'dist-packages'):
+        if anchor in parts:
+            return '/'.join(parts[parts.index(anchor) + 1:])
+    return '/'.join(parts[-2:])
+
+
+class SamplingProfiler:
+    """
+    Profiler por muestreo: un hilo de fondo toma la pila de cada hilo del proceso cada
+    ``interval`` segundos (``sys._current_frames``), sin instrumentar el código.
+
+    Las pilas se acumulan por hilo (el loop de asyncio y los hilos de Selenium por
+    separado) y se exportan como "collapsed stacks" y como perfil de speedscope.
+    Muestrea todo el proceso: si hay otras tareas en curso, también aparecen.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 128):
+        self.interval = max(0.001, interval)
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "SamplingProfiler":
+        return cls(interval=float(os.getenv('PROFILE_INTERVAL_MS', '10')) / 1000)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - (self.started_at or time.perf_counter())
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack: List[Frame] = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append((code.co_name, _short_path(code.co_filename), code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append((f"thread:{names.get(ident, ident)}", '', 0))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Formato "collapsed stacks" (flamegraph.pl, speedscope, inferno): ``a;b;c <muestras>``"""
+        lines = [
+            ';'.join(name if not path else f"{name} ({path}:{line})" for name, path, line in stack) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        """Perfil "sampled" de speedscope con pesos en milisegundos"""
+        frames: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(round(count * self.interval * 1000, 3))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'marketplace-reviews-scraper',
+            'shared': {
+                'frames': [
+                    {'name': fname, **({'file': path, 'line': line} if path else {})}
+                    for fname, path, line in frames
+                ]
+            },
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(sum(weights), 3),
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+
+    def write(self, directory: str, name: str) -> Dict[str, Any]:
+        """Guarda ``<name>.collapsed`` y ``<name>.speedscope.json``; devuelve rutas y totales"""
+        os.makedirs(directory, exist_ok=True)
+        collapsed_path = os.path.join(directory, f"{name}.collapsed")
+        speedscope_path = os.path.join(directory, f"{name}.speedscope.json")
+        with open(collapsed_path, 'w', encoding='utf-8') as fh:
+            fh.write(self.collapsed())
+        with open(speedscope_path, 'w', encoding='utf-8') as fh:
+            json.dump(self.speedscope(name), fh)
+        logger.info(f"Perfil guardado: {speedscope_path} ({self.samples} muestras)")
+        return {
+            'collapsed': collapsed_path,
+            'speedscope': speedscope_path,
+            'samples': self.samples,
+            'interval_ms': round(self.interval * 1000, 3),
+            'duration_s': round(self.duration, 3),
+        }
+
+
+@contextmanager
+def count_round_trips(driver) -> Iterator[Dict[str, Any]]:
+    """
+    Cuenta los comandos WebDriver (ida y vuelta a chromedriver) emitidos con ``driver``
+
+    Todos los comandos, incluidos los de WebElement (``get_attribute``, ``text``...),
+    pasan por ``driver.execute``; se envuelve en la instancia y se restaura al salir.
+    """
+    stats: Dict[str, Any] = {'total': 0, 'seconds': 0.0, 'commands': Counter()}
+    execute = driver.execute
+
+    def counted(driver_command, params=None):
+        start = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            stats['total'] += 1
+            stats['seconds'] += time.perf_counter() - start
+            stats['commands'][driver_command] += 1
+
+    driver.execute = counted
+    try:
+        yield stats
+    finally:
+        del driver.execute
+        stats['seconds'] = round(stats['seconds'], 3)
+        stats['commands'] = dict(stats['commands'].most_common())
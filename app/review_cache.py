@@ -0,0 +1,250 @@
+"""
+Cache de resultados de scraping por URL de producto, con coalescencia de solicitudes en curso
+"""
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from loguru import logger
+
+# Parámetros de tracking que no cambian el producto en ningún sitio (además de utm_*)
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'mc_cid', 'mc_eid', 'igshid', '_ga'}
+
+# Parámetros de tracking propios de Mercado Libre y Amazon: en otros sitios (p. ej.
+# ``product.php?type=123``) pueden identificar el producto, así que solo se quitan aquí
+MARKETPLACE_TRACKING_PARAMS = {
+    'tag', 'ref', 'ref_', 'psc', 'tracking_id', 'source', 'spm', 'pdp_filters', 'searchvariation',
+    'position', 'type', 'sid', 'qid', 'sr', 'keywords', 'crid', 'sprefix', 'th', 'matt_tool', 'matt_word',
+}
+
+# Producto de catálogo de ML: /p/MLA15149561 (otro espacio de IDs que las publicaciones)
+ML_CATALOG_ID = re.compile(r'/p/(M[A-Z]{2})(\d{6,})\b', re.IGNORECASE)
+# Publicación de ML: MLA-123456789, MLA123456789 (todos los sitios de ML usan M + 2 letras)
+ML_ITEM_ID = re.compile(r'\b(M[A-Z]{2})-?(\d{6,})\b', re.IGNORECASE)
+# /dp/B0ABCDEFGH, /gp/product/..., /product-reviews/..., /gp/aw/d/...
+AMAZON_ASIN = re.compile(
+    r'/(?:dp|gp/product|gp/aw/d|product-reviews|exec/obidos/asin)/([A-Z0-9]{10})(?:[/?]|$)',
+    re.IGNORECASE
+)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Clave canónica de un producto.
+
+    - Mercado Libre: ``mercadolibre:MLA123456789`` para publicaciones y
+      ``mercadolibre:catalog:MLA15149561`` para productos de catálogo (``/p/``)
+    - Amazon: ``amazon:<dominio>:<ASIN>`` (las reseñas varían por dominio)
+    - Resto: esquema/host en minúsculas, sin ``www.``, fragmento, '/' final ni parámetros
+      de tracking (en ML/Amazon se quitan además sus parámetros propios)
+
+    Casos cubiertos (``python -m doctest app/review_cache.py``):
+
+    >>> cases = [
+    ...     ('https://articulo.mercadolibre.com.ar/MLA-123456789-zapatilla-_JM', 'mercadolibre:MLA123456789'),
+    ...     ('https://articulo.mercadolibre.com.ar/MLA-123456789-zapatilla-_JM?position=3&type=item#reviews',
+    ...      'mercadolibre:MLA123456789'),
+    ...     ('https://produto.mercadolivre.com.br/MLB-987654321-x', 'mercadolibre:MLB987654321'),
+    ...     ('https://www.mercadolibre.com.ar/apple-iphone-15/p/MLA15149561', 'mercadolibre:catalog:MLA15149561'),
+    ...     ('https://www.mercadolibre.com.ar/p/MLA15149561?pdp_filters=category:MLA1055',
+    ...      'mercadolibre:catalog:MLA15149561'),
+    ...     ('https://articulo.mercadolibre.com.ar/MLA-15149561-x', 'mercadolibre:MLA15149561'),
+    ...     ('https://www.amazon.com/dp/B0ABCDEFGH?tag=x-20&th=1', 'amazon:amazon.com:B0ABCDEFGH'),
+    ...     ('https://amazon.com/Some-Name/dp/b0abcdefgh/ref=sr_1_1?qid=1&sr=8-1', 'amazon:amazon.com:B0ABCDEFGH'),
+    ...     ('https://www.amazon.com.mx/product-reviews/B0ABCDEFGH', 'amazon:amazon.com.mx:B0ABCDEFGH'),
+    ...     ('https://www.amazon.com/s?k=zapatilla&ref=nb_sb', 'https://amazon.com/s?k=zapatilla'),
+    ...     ('https://Tienda.example/product.php?type=123', 'https://tienda.example/product.php?type=123'),
+    ...     ('https://tienda.example/product.php?type=456', 'https://tienda.example/product.php?type=456'),
+    ...     ('https://shop.example/item?sid=9&utm_source=mail&gclid=abc', 'https://shop.example/item?sid=9'),
+    ...     ('https://www.shop.example/p/zapatilla/?fbclid=1#opiniones', 'https://shop.example/p/zapatilla'),
+    ...     ('https://shop.example/item?b=2&a=1', 'https://shop.example/item?a=1&b=2'),
+    ... ]
+    >>> [(url, canonicalize_url(url)) for url, key in cases if canonicalize_url(url) != key]
+    []
+    """
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower().split('@')[-1]
+    if host.startswith('www.'):
+        host = host[4:]
+
+    marketplace = None
+    if 'mercadolibre' in host or 'mercadolivre' in host:
+        marketplace = 'mercadolibre'
+        match = ML_CATALOG_ID.search(parsed.path)
+        if match:
+            return f"mercadolibre:catalog:{match.group(1).upper()}{match.group(2)}"
+        match = ML_ITEM_ID.search(parsed.path)
+        if match:
+            return f"mercadolibre:{match.group(1).upper()}{match.group(2)}"
+    elif 'amazon' in host:
+        marketplace = 'amazon'
+        match = AMAZON_ASIN.search(parsed.path)
+        if match:
+            return f"amazon:{host}:{match.group(1).upper()}"
+
+    ignored = TRACKING_PARAMS | MARKETPLACE_TRACKING_PARAMS if marketplace else TRACKING_PARAMS
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if k.lower() not in ignored and not k.lower().startswith('utm_')
+    )
+    path = parsed.path.rstrip('/') or '/'
+    suffix = f"?{urlencode(query)}" if query else ''
+    return f"{(parsed.scheme or 'https').lower()}://{host}{path}{suffix}"
+
+
+class ReviewCache:
+    """
+    Cache LRU con TTL y límite de memoria para listas de reseñas.
+
+    Las solicitudes concurrentes por la misma URL canónica comparten un único
+    futuro, de modo que solo una sesión de navegador se abre por producto.
+    """
+
+    def __init__(self, ttl_seconds: float = 6 * 3600, max_entries: int = 500, max_bytes: int = 64 * 2**20):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'stale': 0, 'evictions': 0}
+
+    @classmethod
+    def from_env(cls) -> "ReviewCache":
+        return cls(
+            ttl_seconds=float(os.getenv('CACHE_TTL_SECONDS', str(6 * 3600))),
+            max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '500')),
+            max_bytes=int(float(os.getenv('CACHE_MAX_MB', '64')) * 2**20),
+        )
+
+    async def get_or_fetch(
+        self,
+        url: str,
+        fetch: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        max_age: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Devuelve las reseñas cacheadas o ejecuta ``fetch`` una sola vez por URL
+
+        Args:
+            url: URL del producto (se canonicaliza)
+            fetch: Corrutina que scrapea el producto
+            max_age: Antigüedad máxima aceptable en segundos (None = TTL, 0 = no usar cache)
+        """
+        reviews, _ = await self.get_or_fetch_entry(url, fetch, max_age)
+        return reviews
+
+    async def get_or_fetch_entry(
+        self,
+        url: str,
+        fetch: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        max_age: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        Igual que ``get_or_fetch``, pero devuelve también cuándo se scrapearon las reseñas
+        (epoch UTC, inicio del scraping), que en un hit puede ser bastante anterior a ahora
+        """
+        key = canonicalize_url(url)
+
+        entry = self._lookup(key, max_age)
+        if entry is not None:
+            self._stats['hits'] += 1
+            return self._copy(entry['reviews']), entry['scraped_at']
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self._stats['coalesced'] += 1
+            logger.info(f"Cache: esperando scraping en curso de {key}")
+            reviews, scraped_at = await asyncio.shield(pending)
+            return self._copy(reviews), scraped_at
+
+        self._stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            scraped_at = time.time()
+            reviews = await fetch()
+            # Las listas vacías suelen ser bloqueos o errores: no se cachean
+            if reviews:
+                self._store(key, reviews, scraped_at)
+            future.set_result((reviews, scraped_at))
+            return self._copy(reviews), scraped_at
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Marca la excepción como leída si nadie más esperaba este futuro
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _lookup(self, key: str, max_age: Optional[float]) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry['stored_at']
+        if age > self.ttl_seconds:
+            self._remove(key)
+            return None
+        if max_age is not None and age > max_age:
+            self._stats['stale'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, reviews: List[Dict[str, Any]], scraped_at: float):
+        size = self._estimate_size(reviews)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = {
+            'reviews': self._copy(reviews), 'stored_at': time.monotonic(), 'scraped_at': scraped_at, 'size': size
+        }
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= entry['size']
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        # Las consultas "stale" terminan contadas también como miss o coalesced
+        lookups = self._stats['hits'] + self._stats['misses'] + self._stats['coalesced']
+        served = self._stats['hits'] + self._stats['coalesced']
+        return {
+            **self._stats,
+            'hit_rate': round(served / lookups, 4) if lookups else 0.0,
+            'entries': len(self._entries),
+            'in_flight': len(self._in_flight),
+            'size_mb': round(self._bytes / 2**20, 3),
+            'max_entries': self.max_entries,
+            'max_mb': round(self.max_bytes / 2**20, 3),
+            'ttl_seconds': self.ttl_seconds,
+        }
+
+    @staticmethod
+    def _copy(reviews: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [dict(r) for r in reviews]
+
+    @staticmethod
+    def _estimate_size(reviews: List[Dict[str, Any]]) -> int:
+        # Aproximación: bytes de los textos + overhead fijo por dict
+        return sum(
+            200 + sum(len(str(v)) for v in r.values())
+            for r in reviews
+        )
@@ -0,0 +1,138 @@
+"""
+Post-procesamiento vectorizado de reseñas con pandas: limpieza de texto, fechas y estadísticas
+"""
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+COLUMNS = ['contenido', 'rating', 'fecha', 'autor', 'titulo', 'marketplace']
+
+# Prefijo de 3 letras del mes (sin acentos) en español, portugués e inglés
+MONTHS = {
+    'ene': 1, 'jan': 1,
+    'feb': 2, 'fev': 2,
+    'mar': 3,
+    'abr': 4, 'apr': 4,
+    'may': 5, 'mai': 5,
+    'jun': 6,
+    'jul': 7,
+    'ago': 8, 'aug': 8,
+    'sep': 9, 'set': 9,
+    'oct': 10, 'out': 10,
+    'nov': 11,
+    'dic': 12, 'dez': 12, 'dec': 12,
+}
+
+# "3 de mayo de 2024", "03 may. 2024", "3 de março de 2024"
+_DAY_MONTH_YEAR = r'(?P<day>\d{1,2})\s+(?:de\s+)?(?P<month>[a-z]{3,})\.?\s+(?:de\s+|del\s+)?(?P<year>\d{4})'
+# "May 3, 2024"
+_MONTH_DAY_YEAR = r'(?P<month>[a-z]{3,})\.?\s+(?P<day>\d{1,2}),?\s+(?P<year>\d{4})'
+# "03/05/2024" (día/mes, como en Latinoamérica)
+_NUMERIC = r'(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{4})'
+# "2024-05-03"
+_ISO = r'(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})'
+
+# Restos de botones que quedan pegados al texto de la reseña
+_TRAILING_NOISE = r'\s*(?:leer más|ver más|leia mais|read more|mostrar más|\.\.\.)\s*$'
+
+
+def reviews_to_frame(reviews: List[Dict[str, Any]]) -> pd.DataFrame:
+    """DataFrame con las columnas estándar de reseña (las faltantes quedan vacías)"""
+    return pd.DataFrame.from_records(reviews, columns=COLUMNS)
+
+
+def clean_text(series: pd.Series) -> pd.Series:
+    """Colapsa espacios, quita restos de "Leer más" y recorta"""
+    return (
+        series.fillna('').astype(str)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.replace(_TRAILING_NOISE, '', case=False, regex=True)
+        .str.strip()
+    )
+
+
+def parse_dates(series: pd.Series) -> pd.Series:
+    """
+    Convierte fechas de texto en español, portugués o inglés a datetime64
+
+    Los textos sin fecha reconocible (p. ej. "hace 3 meses") quedan como NaT.
+    """
+    text = (
+        series.fillna('').astype(str).str.lower()
+        .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    )
+    parts = pd.DataFrame(index=series.index, columns=['day', 'month', 'year'], dtype=object)
+
+    for pattern, named_month in [(_DAY_MONTH_YEAR, True), (_MONTH_DAY_YEAR, True), (_NUMERIC, False), (_ISO, False)]:
+        missing = parts['year'].isna()
+        if not missing.any():
+            break
+        found = text[missing].str.extract(pattern)
+        if named_month:
+            found['month'] = found['month'].str[:3].map(MONTHS)
+        found = found.dropna()
+        parts.loc[found.index, ['day', 'month', 'year']] = found[['day', 'month', 'year']].values
+
+    numeric = parts.apply(pd.to_numeric, errors='coerce')
+    return pd.to_datetime(numeric[['year', 'month', 'day']], errors='coerce')
+
+
+def normalize_ratings(series: pd.Series) -> pd.Series:
+    """Rating numérico en [1, 5]; 0 o valores no numéricos (sin rating) quedan como NaN"""
+    ratings = pd.to_numeric(series, errors='coerce')
+    return ratings.where((ratings > 0) & (ratings <= 5))
+
+
+def summarize(df: pd.DataFrame) -> Dict[str, Any]:
+    """Cantidad, rating promedio, histograma por estrellas y rango de fechas"""
+    ratings = df['rating_num'].dropna()
+    dates = df['fecha_iso'].dropna()
+    histogram = ratings.round().astype(int).value_counts().reindex(range(1, 6), fill_value=0)
+    return {
+        'count': int(len(df)),
+        'rated': int(len(ratings)),
+        'rating_mean': round(float(ratings.mean()), 2) if len(ratings) else None,
+        'histogram': {str(stars): int(n) for stars, n in histogram.items()},
+        'date_min': dates.min().date().isoformat() if len(dates) else None,
+        'date_max': dates.max().date().isoformat() if len(dates) else None,
+    }
+
+
+def postprocess_reviews(reviews: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Normaliza las reseñas de un producto en una sola pasada
+
+    Returns:
+        (reseñas con texto limpio, rating normalizado y ``fecha_iso``, resumen del producto)
+    """
+    df = reviews_to_frame(reviews)
+    for column in ['contenido', 'titulo', 'autor', 'fecha']:
+        df[column] = clean_text(df[column])
+    df['rating_num'] = normalize_ratings(df['rating'])
+    df['fecha_iso'] = parse_dates(df['fecha'])
+
+    summary = summarize(df)
+
+    out = df[['contenido', 'fecha', 'autor', 'titulo', 'marketplace']].copy()
+    out['marketplace'] = out['marketplace'].fillna('')
+    out['rating'] = df['rating_num'].astype(object).where(df['rating_num'].notna(), 0.0)
+    out['fecha_iso'] = df['fecha_iso'].dt.strftime('%Y-%m-%d').fillna('')
+    return out[COLUMNS + ['fecha_iso']].to_dict('records'), summary
+
+
+def summary_rows(summary: Dict[str, Any]) -> List[List[str]]:
+    """
+    Pares [etiqueta, valor] del resumen; en la hoja del producto las etiquetas son
+    encabezados de columna, así que deben ser únicas y no repetir las de las reseñas
+    """
+    rows = [
+        ['Total reseñas', str(summary['count'])],
+        ['Con rating', str(summary['rated'])],
+        ['Rating promedio', '' if summary['rating_mean'] is None else str(summary['rating_mean'])],
+    ]
+    rows += [[f"{stars}★", str(summary['histogram'][str(stars)])] for stars in range(5, 0, -1)]
+    rows += [
+        ['Fecha más antigua', summary['date_min'] or ''],
+        ['Fecha más reciente', summary['date_max'] or ''],
+    ]
+    return rows
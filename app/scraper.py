@@ -3,6 +3,7 @@ Módulo para scraping de reseñas de marketplace (Completo: ML, Amazon, Genéric
 """
 import asyncio
 import json
+import os
 from typing import List, Dict, Optional, Any
 import re
 from urllib.parse import urlparse
@@ -14,17 +15,90 @@ from selenium.webdriver.common.by import By
 from loguru import logger
 import time
 import random
+import hashlib
+from datetime import datetime, timezone
 
 from app.google_drive_handler import GoogleDriveHandler
+from app.review_cache import ReviewCache, canonicalize_url
+from app.browser_pool import BrowserPool
+from app.review_postprocessing import postprocess_reviews, summary_rows
+from app.memory_governor import MemoryGovernor
+from app.cluster import ClusterCoordinator
+from app.profiling import count_round_trips
+
+# Estado escrito en ARCHIVOJSON: "OK: <hoja> (<N> reseñas) | <fecha UTC> | <huella>"
+STATUS_PATTERN = re.compile(
+    r'^OK: (?P<sheet>.*) \((?P<count>\d+) reseñas\) \| (?P<scraped_at>\S+) \| (?P<fingerprint>[0-9a-f]+)$'
+)
+STATUS_TIME_FORMAT = '%Y-%m-%dT%H:%MZ'
 
 class ReviewScraper:
     
-    def __init__(self, drive_handler: GoogleDriveHandler):
+    # Contenedores de reseñas: solo se transfiere y parsea su HTML, no la página completa
+    REVIEW_CONTAINERS = {
+        'mercadolibre': ['.ui-review-capability-comments', '.ui-review-capability', '#reviews_capability_v3'],
+        'amazon': ['#cm_cr-review_list', '#cm-cr-dp-review-list', '#reviewsMedley'],
+    }
+    # Selectores "Escopeta" para Shopify, Woo, etc.
+    GENERIC_REVIEW_SELECTORS = [
+        'div.review', 'div.comment', 'li.review', 'div.stamped-review', 
+        'div.yotpo-review', 'div.spr-review'
+    ]
+    
+    # Incrementar al cambiar la navegación o el parseo de un marketplace:
+    # invalida la huella de sus filas y fuerza re-scrapearlas
+    STRATEGY_VERSIONS = {'mercadolibre': 1, 'amazon': 1, 'generic': 1}
+    
+    def __init__(self, drive_handler: GoogleDriveHandler, delay_scale: Optional[float] = None,
+                 max_workers: Optional[int] = None, cache: Optional[ReviewCache] = None,
+                 cache_max_age: Optional[float] = None, skip_max_age_hours: Optional[float] = None,
+                 force: bool = False, browser_pool: Optional[BrowserPool] = None,
+                 memory_governor: Optional[MemoryGovernor] = None,
+                 cluster: Optional[ClusterCoordinator] = None, profile: bool = False,
+                 domain_slots: Optional[Dict[str, asyncio.Semaphore]] = None):
         self.drive_handler = drive_handler
         self.chrome_service = Service("/usr/bin/chromedriver")
         self.chrome_options = self._setup_chrome_options()
+        # Factor aplicado a todas las esperas "humanas" (0 = sin esperas, útil en benchmarks)
+        if delay_scale is None:
+            delay_scale = float(os.getenv('SCRAPER_DELAY_SCALE', '1.0'))
+        self.delay_scale = max(0.0, delay_scale)
+        # Sesiones de navegador simultáneas en el pipeline compartido
+        if max_workers is None:
+            max_workers = int(os.getenv('MAX_WORKERS', '3'))
+        self.max_workers = max(1, max_workers)
+        self._browser_slots = asyncio.Semaphore(self.max_workers)
+        # Sesiones simultáneas contra un mismo dominio (por defecto una, como el recorrido secuencial);
+        # domain_slots permite compartir los semáforos entre varios scrapers
+        self.max_workers_per_domain = max(1, int(os.getenv('MAX_WORKERS_PER_DOMAIN', '1')))
+        self._domain_slots: Dict[str, asyncio.Semaphore] = {} if domain_slots is None else domain_slots
+        # Cache compartido entre tareas; cache_max_age es la ventana de frescura aceptada
+        self.cache = cache
+        self.cache_max_age = cache_max_age
+        # Filas con estado OK, misma huella y más recientes que esto se saltan (salvo force)
+        if skip_max_age_hours is None:
+            skip_max_age_hours = float(os.getenv('SKIP_MAX_AGE_HOURS', '168'))
+        self.skip_max_age_hours = skip_max_age_hours
+        self.force = force
+        # Pool de navegadores precalentados (opcional, compartido por la API)
+        self.browser_pool = browser_pool
+        # Control de memoria compartido (opcional) y tope del HTML extraído por producto
+        self.memory_governor = memory_governor
+        self.max_page_chars = int(float(os.getenv('MAX_PAGE_SOURCE_MB', '8')) * 2**20)
+        # Modo cluster (opcional): cola compartida entre nodos y rate limit por dominio común
+        self.cluster = cluster
+        # Con profile, comandos WebDriver por URL canónica scrapeada (se informan en cada fila)
+        self.webdriver_round_trips: Optional[Dict[str, Dict[str, Any]]] = {} if profile else None
     
-    def _setup_chrome_options(self) -> Options:
+    @classmethod
+    def launch_driver(cls) -> webdriver.Chrome:
+        """Lanza un Chromium headless con la configuración anti-detección"""
+        driver = webdriver.Chrome(service=Service("/usr/bin/chromedriver"), options=cls._setup_chrome_options())
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return driver
+    
+    @staticmethod
+    def _setup_chrome_options() -> Options:
         chrome_options = Options()
         chrome_options.binary_location = "/usr/bin/chromium"
         
@@ -40,47 +114,42 @@ class ReviewScraper:
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         return chrome_options
     
-    async def scrape_from_spreadsheet(self, spreadsheet_name: str, sheet_name: str, drive_folder_id: Optional[str] = None) -> Dict[str, Any]:
+    async def scrape_from_spreadsheet(self, spreadsheet_name: str, sheet_name: str, drive_folder_id: Optional[str] = None,
+                                      start_row: Optional[int] = None, end_row: Optional[int] = None,
+                                      filters: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         try:
             logger.info("--- INICIANDO SCRAPING MULTI-PLATAFORMA ---")
-            records = self.drive_handler.read_spreadsheet(spreadsheet_name, sheet_name)
-            
-            try:
-                column_letter = self.drive_handler.find_column_letter(spreadsheet_name, sheet_name, 'ARCHIVOJSON')
-            except:
-                column_letter = "E"
+            column_letter = await asyncio.to_thread(self._archive_column, spreadsheet_name, sheet_name)
             
             results = []
             
-            for idx, record in enumerate(records, start=2):
+            # Las filas se leen por ventanas: el primer producto arranca sin esperar la hoja completa.
+            # Cada lectura es una llamada HTTP bloqueante, así que se avanza el iterador en un hilo
+            rows = self._iter_sheet_rows(spreadsheet_name, sheet_name, start_row, end_row, filters)
+            while True:
+                row = await asyncio.to_thread(next, rows, None)
+                if row is None:
+                    break
                 try:
-                    product_name = record.get('PRODUCTO', f'producto_{idx}')
-                    product_url = record.get('URL', '')
-                    if not product_url: continue
-                    
-                    logger.info(f"Procesando: {product_name} ({self._detect_marketplace(product_url)})")
-                    reviews = await self.scrape_product_reviews(product_url, product_name)
+                    skipped = self._skip_result(row)
+                    if skipped:
+                        results.append(skipped)
+                        continue
                     
-                    if reviews:
-                        sheet_title = self._sanitize_sheet_name(product_name)
-                        self.drive_handler.save_reviews_to_new_sheet(spreadsheet_name, sheet_title, reviews)
-                        msg = f"OK: {sheet_title} ({len(reviews)} reseñas)"
-                    else:
-                        msg = "Falló: 0 reseñas"
-                        
-                    self.drive_handler.update_cell(spreadsheet_name, sheet_name, idx, column_letter, msg)
+                    logger.info(f"Procesando: {row['producto']} ({self._detect_marketplace(row['url'])})")
+                    reviews, scraped_at = await self._fetch_reviews(row['url'])
+                    reviews, summary = self._postprocess(reviews)
+                    # La escritura (por bloques, con reintentos) corre en un hilo para no frenar la API
+                    results.append(await asyncio.to_thread(
+                        self._store_row_result,
+                        spreadsheet_name, sheet_name, column_letter, row, reviews,
+                        summary=summary, scraped_at=scraped_at
+                    ))
                     
-                    # Agregamos el nombre sanitizado al resultado para que n8n sepa qué hoja leer
-                    results.append({
-                        'producto': product_name, 
-                        'sheet_created': self._sanitize_sheet_name(product_name),
-                        'count': len(reviews)
-                    })
-                    
-                    await asyncio.sleep(random.uniform(4, 7))
+                    await asyncio.sleep(self._delay(4, 7))
                     
                 except Exception as e:
-                    logger.error(f"Error item {idx}: {e}")
+                    logger.error(f"Error item {row['idx']}: {e}")
                     continue
             
             return {'status': 'success', 'results': results}
@@ -88,7 +157,305 @@ class ReviewScraper:
             logger.error(f"Error general: {e}")
             raise
 
+    async def scrape_from_spreadsheets(self, targets: List[Dict[str, str]], drive_folder_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Scraping de varias planillas/hojas en un solo pipeline compartido.
+
+        Las URLs repetidas entre hojas se scrapean una sola vez y el resultado se
+        escribe en cada fila que la pidió. Las sesiones de navegador se reparten
+        entre ``max_workers`` slots, intercalando dominios. En modo cluster las URLs
+        se encolan en la cola compartida y las procesan todos los nodos.
+
+        Si en una planilla el mismo PRODUCTO apunta a URLs distintas (p. ej. la
+        publicación de ML y la de Amazon), cada URL escribe en su propia hoja
+        (``<producto> - <marketplace>``) en lugar de pisarse en una sola.
+
+        Args:
+            targets: Lista de dicts con ``spreadsheet_name`` y ``sheet_name`` (y opcionalmente
+                ``start_row``, ``end_row`` y ``filters``)
+        """
+        logger.info(f"--- INICIANDO SCRAPING MASIVO ({len(targets)} hojas) ---")
+        sheets = []
+        jobs: Dict[str, Dict[str, Any]] = {}
+        read_rows = []
+        total_rows = 0
+        
+        for sheet_idx, target in enumerate(targets):
+            sheet = {
+                'spreadsheet_name': target['spreadsheet_name'],
+                'sheet_name': target['sheet_name'],
+                'status': 'success',
+                'results': []
+            }
+            sheets.append(sheet)
+            try:
+                # Lecturas bloqueantes de la API: en un hilo, para no frenar la API ni los latidos
+                column_letter = await asyncio.to_thread(
+                    self._archive_column, sheet['spreadsheet_name'], sheet['sheet_name']
+                )
+                rows = await asyncio.to_thread(list, self._iter_sheet_rows(
+                    sheet['spreadsheet_name'], sheet['sheet_name'],
+                    target.get('start_row'), target.get('end_row'), target.get('filters')
+                ))
+            except Exception as e:
+                logger.error(f"Error leyendo {sheet['spreadsheet_name']} - {sheet['sheet_name']}: {e}")
+                sheet.update(status='failed', error=str(e))
+                continue
+            
+            read_rows.extend((sheet_idx, column_letter, row) for row in rows)
+        
+        tabs = self._product_tabs((sheets[sheet_idx]['spreadsheet_name'], row) for sheet_idx, _, row in read_rows)
+        for sheet_idx, column_letter, row in read_rows:
+            sheet = sheets[sheet_idx]
+            total_rows += 1
+            skipped = self._skip_result(row)
+            if skipped:
+                sheet['results'].append(skipped)
+                continue
+            key = canonicalize_url(row['url'])
+            job = jobs.setdefault(key, {'url': row['url'], 'producto': row['producto'], 'destinos': []})
+            # Solo datos serializables: en modo cluster el trabajo viaja a otro nodo
+            job['destinos'].append({
+                'sheet': sheet_idx,
+                'spreadsheet_name': sheet['spreadsheet_name'],
+                'sheet_name': sheet['sheet_name'],
+                'column_letter': column_letter,
+                'tab': tabs[(sheet['spreadsheet_name'], self._sanitize_sheet_name(row['producto']), key)],
+                'row': row
+            })
+        
+        logger.info(f"{total_rows} filas -> {len(jobs)} URLs únicas")
+        scheduled = self._interleave_by_domain(list(jobs.values()))
+        if self.cluster is not None:
+            for job in scheduled:
+                job['cache_max_age'] = 0 if self.force else self.cache_max_age
+                job['profile'] = self.webdriver_round_trips is not None
+            outcomes = await self.cluster.run_batch(scheduled)
+        else:
+            outcomes = await asyncio.gather(*(self._run_shared_job(job) for job in scheduled))
+        for job_outcomes in outcomes:
+            for sheet_idx, result in job_outcomes or []:
+                sheets[sheet_idx]['results'].append(result)
+        
+        return {
+            'status': 'success',
+            'rows': total_rows,
+            'skipped': sum(1 for sheet in sheets for r in sheet['results'] if r.get('skipped')),
+            'unique_urls': len(jobs),
+            'sheets': sheets
+        }
+
+    async def _run_shared_job(self, job: Dict[str, Any]) -> List[tuple]:
+        """
+        Scrapea una URL (ocupando un slot de su dominio y uno de navegador) y escribe el
+        resultado en sus filas
+
+        Returns:
+            Lista de (índice de hoja, resultado de la fila) para cada destino escrito
+        """
+        outcomes = []
+        domain = urlparse(job['url']).netloc.lower()
+        domain_slots = self._domain_slots.setdefault(domain, asyncio.Semaphore(self.max_workers_per_domain))
+        # Primero el slot del dominio: no se ocupa un navegador mientras se espera turno
+        async with domain_slots, self._browser_slots:
+            try:
+                logger.info(f"Procesando: {job['producto']} ({self._detect_marketplace(job['url'])}) -> {len(job['destinos'])} filas")
+                reviews, scraped_at = await self._fetch_reviews(job['url'])
+                reviews, summary = self._postprocess(reviews)
+            except Exception as e:
+                logger.error(f"Error scrapeando {job['url']}: {e}")
+                return outcomes
+            
+            # Varias hojas de producto con el mismo resultado: se escriben en paralelo
+            failed_tabs: Dict[tuple, str] = {}
+            tabs = list(dict.fromkeys((dest['spreadsheet_name'], dest['tab']) for dest in job['destinos']))
+            parallel = bool(reviews) and len(tabs) > 1
+            if parallel:
+                written = await asyncio.to_thread(
+                    self.drive_handler.save_reviews_parallel,
+                    [
+                        (spreadsheet_name, tab, reviews, summary_rows(summary) if summary else None)
+                        for spreadsheet_name, tab in tabs
+                    ]
+                )
+                failed_tabs = {
+                    (o['spreadsheet_name'], o['sheet_name']): o['error']
+                    for o in written if o['status'] == 'failed'
+                }
+            
+            for dest in job['destinos']:
+                row = dest['row']
+                try:
+                    if (dest['spreadsheet_name'], dest['tab']) in failed_tabs:
+                        raise RuntimeError(failed_tabs[(dest['spreadsheet_name'], dest['tab'])])
+                    outcomes.append((dest['sheet'], await asyncio.to_thread(
+                        self._store_row_result,
+                        dest['spreadsheet_name'], dest['sheet_name'], dest['column_letter'], row, reviews,
+                        summary=summary, scraped_at=scraped_at, write_reviews=not parallel, sheet_title=dest['tab']
+                    )))
+                except Exception as e:
+                    logger.error(f"Error item {row['idx']} ({dest['spreadsheet_name']}): {e}")
+            
+            await asyncio.sleep(self._delay(4, 7))
+        return outcomes
+
+    def _product_tabs(self, rows) -> Dict[tuple, str]:
+        """
+        Hoja de producto de cada (planilla, nombre sanitizado de PRODUCTO, URL canónica)
+
+        Normalmente es el nombre sanitizado del producto. Si en una planilla ese nombre
+        corresponde a más de una URL, se le agrega el marketplace (y un número si aun
+        así se repite), para que trabajos concurrentes no escriban en la misma hoja.
+
+        Args:
+            rows: Pares (planilla, fila) con todas las filas leídas, incluidas las que se saltan
+        """
+        groups: Dict[tuple, Dict[str, str]] = {}
+        for spreadsheet_name, row in rows:
+            urls = groups.setdefault((spreadsheet_name, self._sanitize_sheet_name(row['producto'])), {})
+            urls.setdefault(canonicalize_url(row['url']), row['url'])
+        
+        tabs = {}
+        for (spreadsheet_name, base), urls in groups.items():
+            seen: Dict[str, int] = {}
+            for key, url in urls.items():
+                tab = base
+                if len(urls) > 1:
+                    marketplace = self._detect_marketplace(url)
+                    seen[marketplace] = seen.get(marketplace, 0) + 1
+                    suffix = f" - {marketplace}" + (f" {seen[marketplace]}" if seen[marketplace] > 1 else '')
+                    tab = base[:95 - len(suffix)].strip() + suffix
+                tabs[(spreadsheet_name, base, key)] = tab
+        return tabs
+
+    def _archive_column(self, spreadsheet_name: str, sheet_name: str) -> str:
+        """Letra de la columna ARCHIVOJSON (E si no se puede determinar)"""
+        try:
+            return self.drive_handler.find_column_letter(spreadsheet_name, sheet_name, 'ARCHIVOJSON')
+        except:
+            return "E"
+
+    def _iter_sheet_rows(self, spreadsheet_name: str, sheet_name: str, start_row: Optional[int] = None,
+                         end_row: Optional[int] = None, filters: Optional[Dict[str, str]] = None):
+        """Entrega, a medida que se leen, las filas de la hoja de entrada que tienen URL"""
+        for idx, record in self.drive_handler.iter_spreadsheet_rows(
+            spreadsheet_name, sheet_name, start_row=start_row, end_row=end_row, filters=filters
+        ):
+            product_url = str(record.get('URL', '') or '').strip()
+            if not product_url: continue
+            yield {
+                'idx': idx,
+                'producto': record.get('PRODUCTO') or f'producto_{idx}',
+                'url': product_url,
+                'estado': str(record.get('ARCHIVOJSON', '') or '')
+            }
+
+    def _fingerprint(self, url: str) -> str:
+        """Huella de (URL canónica, versión de estrategia del marketplace)"""
+        marketplace = self._detect_marketplace(url)
+        version = self.STRATEGY_VERSIONS.get(marketplace, 1)
+        key = f"{canonicalize_url(url)}|{marketplace}:{version}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+    def _skip_result(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Resultado "saltado" si la fila ya fue scrapeada con la misma huella dentro de
+        skip_max_age_hours; None si hay que scrapearla
+        """
+        if self.force:
+            return None
+        match = STATUS_PATTERN.match(row.get('estado', '').strip())
+        if not match or match.group('fingerprint') != self._fingerprint(row['url']):
+            return None
+        try:
+            scraped_at = datetime.strptime(match.group('scraped_at'), STATUS_TIME_FORMAT).replace(tzinfo=timezone.utc)
+        except ValueError:
+            return None
+        age_hours = (datetime.now(timezone.utc) - scraped_at).total_seconds() / 3600
+        if age_hours > self.skip_max_age_hours:
+            return None
+        
+        logger.info(f"Saltando: {row['producto']} (scrapeado hace {age_hours:.1f} h, sin cambios)")
+        return {
+            'producto': row['producto'],
+            'sheet_created': match.group('sheet'),
+            'count': int(match.group('count')),
+            'skipped': True
+        }
+
+    def _store_row_result(self, spreadsheet_name: str, sheet_name: str, column_letter: str,
+                          row: Dict[str, Any], reviews: List[Dict[str, Any]],
+                          summary: Optional[Dict[str, Any]] = None,
+                          scraped_at: Optional[float] = None,
+                          write_reviews: bool = True, sheet_title: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Guarda las reseñas en la hoja del producto y actualiza la columna ARCHIVOJSON
+
+        ``scraped_at`` (epoch) es cuándo se scrapearon las reseñas; un resultado cacheado
+        conserva su fecha original para que la política de salto mida desde ahí.
+        ``sheet_title`` reemplaza el nombre de hoja derivado de PRODUCTO.
+        """
+        product_name = row['producto']
+        sheet_title = sheet_title or self._sanitize_sheet_name(product_name)
+        if reviews:
+            if write_reviews:
+                self.drive_handler.save_reviews_to_new_sheet(
+                    spreadsheet_name, sheet_title, reviews,
+                    summary_rows=summary_rows(summary) if summary else None
+                )
+            stamp = datetime.fromtimestamp(scraped_at, timezone.utc) if scraped_at else datetime.now(timezone.utc)
+            msg = (
+                f"OK: {sheet_title} ({len(reviews)} reseñas) | {stamp.strftime(STATUS_TIME_FORMAT)} | "
+                f"{self._fingerprint(row['url'])}"
+            )
+        else:
+            msg = "Falló: 0 reseñas"
+            
+        self.drive_handler.update_cell(spreadsheet_name, sheet_name, row['idx'], column_letter, msg)
+        
+        # Agregamos el nombre sanitizado al resultado para que n8n sepa qué hoja leer
+        result = {
+            'producto': product_name, 
+            'sheet_created': sheet_title,
+            'count': len(reviews)
+        }
+        if summary:
+            result['resumen'] = summary
+        if self.webdriver_round_trips is not None:
+            round_trips = self.webdriver_round_trips.get(canonicalize_url(row['url']))
+            if round_trips is not None:
+                result['webdriver_round_trips'] = round_trips
+        return result
+
+    def _postprocess(self, reviews: List[Dict[str, Any]]):
+        """Limpieza, fechas normalizadas y resumen del producto; ante un error se usan las reseñas crudas"""
+        if not reviews:
+            return reviews, None
+        try:
+            return postprocess_reviews(reviews)
+        except Exception as e:
+            logger.warning(f"Post-procesamiento falló, se guardan las reseñas sin normalizar: {e}")
+            return reviews, None
+
     async def scrape_product_reviews(self, product_url: str, product_name: str) -> List[Dict[str, Any]]:
+        reviews, _ = await self._fetch_reviews(product_url)
+        return reviews
+
+    async def _fetch_reviews(self, product_url: str):
+        """(reseñas, epoch en que se scrapearon); con force nunca se usa el cache"""
+        if self.cache is not None:
+            return await self.cache.get_or_fetch_entry(
+                product_url,
+                lambda: self._scrape_uncached(product_url),
+                max_age=0 if self.force else self.cache_max_age
+            )
+        scraped_at = time.time()
+        return await self._scrape_uncached(product_url), scraped_at
+
+    async def _scrape_uncached(self, product_url: str) -> List[Dict[str, Any]]:
+        if self.cluster is not None:
+            # Ritmo por dominio compartido por todos los nodos
+            await self.cluster.acquire_token(product_url)
         marketplace = self._detect_marketplace(product_url)
         if marketplace == 'mercadolibre':
             return await self._scrape_mercadolibre_selenium(product_url)
@@ -97,6 +464,24 @@ class ReviewScraper:
         else:
              return await self._scrape_generic_selenium(product_url)
 
+    def _delay(self, low: float, high: Optional[float] = None) -> float:
+        """Segundos a esperar entre acciones, escalados por delay_scale"""
+        base = random.uniform(low, high) if high is not None else low
+        return base * self.delay_scale
+
+    def _interleave_by_domain(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Reordena los trabajos en round-robin por dominio para no concentrar visitas"""
+        by_domain: Dict[str, List[Dict[str, Any]]] = {}
+        for job in jobs:
+            by_domain.setdefault(urlparse(job['url']).netloc.lower(), []).append(job)
+        queues = list(by_domain.values())
+        ordered = []
+        while queues:
+            for queue in list(queues):
+                ordered.append(queue.pop(0))
+                if not queue: queues.remove(queue)
+        return ordered
+
     def _detect_marketplace(self, url: str) -> str:
         domain = urlparse(url).netloc.lower()
         if 'mercadolibre' in domain or 'mercadolivre' in domain: return 'mercadolibre'
@@ -128,35 +513,29 @@ class ReviewScraper:
     # CORE DE SELENIUM UNIFICADO (Para evitar repetir código de driver)
     # -------------------------------------------------------------------------
     async def _run_selenium_scraper(self, url: str, strategy: str) -> List[Dict[str, Any]]:
-        reviews = []
+        # Selenium es bloqueante: la sesión corre en un hilo para no congelar la API
+        if self.memory_governor is None:
+            return await asyncio.to_thread(self._run_selenium_session, url, strategy)
+        async with self.memory_governor.slot():
+            return await asyncio.to_thread(self._run_selenium_session, url, strategy)
+
+    def _run_selenium_session(self, url: str, strategy: str) -> List[Dict[str, Any]]:
         driver = None
         try:
             logger.info(f"Lanzando Selenium ({strategy})...")
-            driver = webdriver.Chrome(service=self.chrome_service, options=self.chrome_options)
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            driver.get(url)
-            time.sleep(random.uniform(3, 5))
-            
-            # --- LÓGICA DE NAVEGACIÓN ESPECÍFICA ---
-            if strategy == 'mercadolibre':
-                await self._navigate_ml(driver)
-            elif strategy == 'amazon':
-                await self._navigate_amazon(driver)
-            elif strategy == 'generic':
-                await self._navigate_generic(driver)
-
-            # --- PARSEO GENERAL ---
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            
-            if strategy == 'mercadolibre':
-                reviews = self._parse_mercadolibre(soup)
-            elif strategy == 'amazon':
-                reviews = self._parse_amazon(soup)
+            if self.browser_pool is not None:
+                driver = self.browser_pool.acquire()
             else:
-                reviews = self._parse_generic(soup)
+                driver = webdriver.Chrome(service=self.chrome_service, options=self.chrome_options)
+                driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            return self._deduplicate(reviews)
+            if self.webdriver_round_trips is None:
+                return self._navigate_and_parse(driver, url, strategy)
+            with count_round_trips(driver) as round_trips:
+                try:
+                    return self._navigate_and_parse(driver, url, strategy)
+                finally:
+                    self.webdriver_round_trips[canonicalize_url(url)] = round_trips
 
         except Exception as e:
             logger.error(f"Error Selenium ({strategy}): {e}")
@@ -164,9 +543,72 @@ class ReviewScraper:
         finally:
             if driver: driver.quit()
 
+    def _navigate_and_parse(self, driver, url: str, strategy: str) -> List[Dict[str, Any]]:
+        driver.get(url)
+        time.sleep(self._delay(3, 5))
+        
+        # --- LÓGICA DE NAVEGACIÓN ESPECÍFICA ---
+        if strategy == 'mercadolibre':
+            self._navigate_ml(driver)
+        elif strategy == 'amazon':
+            self._navigate_amazon(driver)
+        elif strategy == 'generic':
+            self._navigate_generic(driver)
+
+        # --- PARSEO GENERAL ---
+        if strategy == 'generic':
+            selectors = [', '.join(self.GENERIC_REVIEW_SELECTORS)]
+        else:
+            selectors = self.REVIEW_CONTAINERS.get(strategy, [])
+        reviews = self._parse_html(self._extract_review_html(driver, selectors), strategy)
+        
+        # Si el contenedor no trajo reseñas, se intenta con la página completa (acotada)
+        if not reviews and selectors:
+            reviews = self._parse_html(self._extract_review_html(driver, []), strategy)
+        
+        return self._deduplicate(reviews)
+
+    def _extract_review_html(self, driver, selectors: List[str]) -> str:
+        """
+        outerHTML de los elementos del primer selector que exista (o del body), truncado
+        a MAX_PAGE_SOURCE_MB. Evita traer driver.page_source completo, que en páginas con
+        scroll infinito puede pesar decenas de MB.
+        """
+        result = driver.execute_script("""
+            const [selectors, maxChars] = arguments;
+            for (const sel of selectors) {
+                const nodes = document.querySelectorAll(sel);
+                if (nodes.length) {
+                    const html = Array.from(nodes, n => n.outerHTML).join('\\n');
+                    return {selector: sel, length: html.length, html: html.slice(0, maxChars)};
+                }
+            }
+            const root = document.body || document.documentElement;
+            const html = root.outerHTML;
+            return {selector: null, length: html.length, html: html.slice(0, maxChars)};
+        """, selectors, self.max_page_chars)
+        
+        if result['length'] > self.max_page_chars:
+            logger.warning(f"HTML de reseñas truncado: {result['length']} -> {self.max_page_chars} caracteres")
+        logger.debug(f"HTML extraído de '{result['selector'] or 'body'}': {min(result['length'], self.max_page_chars)} caracteres")
+        return result['html']
+
+    def _parse_html(self, html: str, strategy: str) -> List[Dict[str, Any]]:
+        """Parsea el HTML con la estrategia indicada y libera el árbol al terminar"""
+        soup = BeautifulSoup(html, 'html.parser')
+        del html
+        try:
+            if strategy == 'mercadolibre':
+                return self._parse_mercadolibre(soup)
+            elif strategy == 'amazon':
+                return self._parse_amazon(soup)
+            return self._parse_generic(soup)
+        finally:
+            soup.decompose()
+
     # --- HELPERS DE NAVEGACIÓN ---
     
-    async def _navigate_ml(self, driver):
+    def _navigate_ml(self, driver):
         # (Tu lógica de navegación ML "Ver todas" + Scroll)
         reviews_url = None
         try:
@@ -182,15 +624,15 @@ class ReviewScraper:
 
         if reviews_url:
             driver.get(reviews_url)
-            time.sleep(3)
+            time.sleep(self._delay(3))
             for _ in range(5):
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1.5)
+                time.sleep(self._delay(1.5))
         else:
              driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-             time.sleep(2)
+             time.sleep(self._delay(2))
 
-    async def _navigate_amazon(self, driver):
+    def _navigate_amazon(self, driver):
         # Amazon "See all reviews"
         try:
             # Buscamos el link data-hook="see-all-reviews-link-foot"
@@ -198,19 +640,19 @@ class ReviewScraper:
             if links:
                 logger.info("Amazon: Yendo a todas las reseñas...")
                 driver.get(links[0].get_attribute('href'))
-                time.sleep(3)
+                time.sleep(self._delay(3))
             else:
                  logger.warning("Amazon: No se halló link 'ver todas', scrolleando home.")
                  driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                 time.sleep(2)
+                 time.sleep(self._delay(2))
         except: pass
 
-    async def _navigate_generic(self, driver):
+    def _navigate_generic(self, driver):
         # Scroll lento para sitios modernos (Shopify/React)
         last_height = driver.execute_script("return document.body.scrollHeight")
         for _ in range(3):
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
+            time.sleep(self._delay(2))
             new_height = driver.execute_script("return document.body.scrollHeight")
             if new_height == last_height: break
             last_height = new_height
@@ -291,14 +733,8 @@ class ReviewScraper:
 
     def _parse_generic(self, soup):
         reviews = []
-        # Selectores "Escopeta" para Shopify, Woo, etc.
-        selectors = [
-            'div.review', 'div.comment', 'li.review', 'div.stamped-review', 
-            'div.yotpo-review', 'div.spr-review'
-        ]
-        
         cards = []
-        for sel in selectors:
+        for sel in self.GENERIC_REVIEW_SELECTORS:
             found = soup.select(sel)
             if found: cards.extend(found)
             
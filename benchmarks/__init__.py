@@ -0,0 +1,3 @@
+"""
+Benchmarks offline del pipeline de scraping (servidor de fixtures + Sheets en memoria)
+"""
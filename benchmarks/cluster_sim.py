@@ -0,0 +1,160 @@
+"""
+Simulación local del modo cluster: varios nodos en un solo proceso sobre una base SQLite temporal
+
+Cada nodo tiene su propio ``ClusterCoordinator`` (misma base, distinto ``node_id``) y
+su bucle de trabajo; el primero además recibe la solicitud masiva y encola las filas.
+Las hojas de Google se reemplazan por ``FakeSheetsClient`` y los productos los sirve
+el servidor de fixtures. Reporta cuántas filas procesó cada nodo, qué parte respetó
+la afinidad de dominio y si algún dominio superó el ritmo configurado.
+
+Uso:
+    python -m benchmarks.cluster_sim --nodes 3 --rows 60
+    python -m benchmarks.cluster_sim --nodes 3 --rows 60 --fake-scrape 0.2   # sin Chromium
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.cluster import ClusterCoordinator
+from app.scraper import ReviewScraper
+from benchmarks.fake_sheets import FakeDriveHandler, FakeSheetsClient
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.run_pipeline import MARKETPLACES, build_sheet
+
+
+def fake_session(seconds: float):
+    """Reemplazo de ``_run_selenium_session``: espera y devuelve reseñas sintéticas"""
+    def run(url: str, strategy: str) -> List[Dict[str, Any]]:
+        time.sleep(seconds)
+        return [
+            {'contenido': f"Reseña {i} de {url}", 'rating': 5.0, 'fecha': '3 de mayo de 2024',
+             'autor': f"Usuario {i}", 'titulo': '', 'marketplace': strategy}
+            for i in range(5)
+        ]
+    return run
+
+
+def rate_violations(starts: List[float], rate_per_minute: float, burst: float) -> int:
+    """Ventanas en las que un dominio arrancó más scrapings de los que permite su bucket"""
+    starts = sorted(starts)
+    violations = 0
+    for i, first in enumerate(starts):
+        for j in range(i, len(starts)):
+            allowed = burst + rate_per_minute * (starts[j] - first) / 60
+            if j - i + 1 > allowed + 1e-6:
+                violations += 1
+    return violations
+
+
+async def simulate(server: FixtureServer, nodes: int, rows: int, rate_per_minute: float, burst: float,
+                   fake_scrape: Optional[float]) -> Dict[str, Any]:
+    client = FakeSheetsClient()
+    spreadsheet_name = build_sheet(client, server, rows)
+    drive_handler = FakeDriveHandler(client)
+    db_path = os.path.join(tempfile.mkdtemp(prefix='cluster-sim-'), 'cluster.db')
+
+    coordinators = [
+        ClusterCoordinator(
+            db_path, node_id=f"nodo-{i + 1}", rate_per_minute=rate_per_minute, burst=burst,
+            heartbeat_interval=0.5, steal_after=2.0, poll_interval=0.1
+        )
+        for i in range(nodes)
+    ]
+    processed: Dict[str, Counter] = defaultdict(Counter)
+    starts: Dict[str, List[float]] = defaultdict(list)
+
+    def make_scraper(coordinator: ClusterCoordinator, cache_max_age=None) -> ReviewScraper:
+        scraper = ReviewScraper(drive_handler, delay_scale=0.0, cluster=coordinator, cache_max_age=cache_max_age)
+        if fake_scrape is not None:
+            scraper._run_selenium_session = fake_session(fake_scrape)
+        return scraper
+
+    def make_handler(coordinator: ClusterCoordinator):
+        async def handler(job: Dict[str, Any]):
+            processed[coordinator.node_id][job['domain']] += 1
+            return await make_scraper(coordinator, job.get('cache_max_age'))._run_shared_job(job)
+        return handler
+
+    for coordinator in coordinators:
+        try_acquire = coordinator.try_acquire_token
+
+        # Se registra el instante que usó el bucket al conceder el token (no cuándo el
+        # loop retoma la corrutina), para no contar demoras del scheduler como violaciones
+        def recorded_acquire(domain: str, _try_acquire=try_acquire):
+            wait, granted_at = _try_acquire(domain)
+            if not wait:
+                starts[domain].append(granted_at)
+            return wait, granted_at
+        coordinator.try_acquire_token = recorded_acquire
+        coordinator.heartbeat()
+
+    workers = [asyncio.create_task(c.run_worker(make_handler(c), concurrency=2)) for c in coordinators]
+    start = time.perf_counter()
+    try:
+        result = await make_scraper(coordinators[0]).scrape_from_spreadsheets(
+            [{'spreadsheet_name': spreadsheet_name, 'sheet_name': 'Hoja1'}]
+        )
+    finally:
+        elapsed = time.perf_counter() - start
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    node_ids = [c.node_id for c in coordinators]
+    total = sum(sum(counter.values()) for counter in processed.values())
+    affine = sum(
+        n for node, counter in processed.items()
+        for domain, n in counter.items() if ClusterCoordinator.owner(domain, node_ids) == node
+    )
+    return {
+        'nodes': nodes,
+        'rows': rows,
+        'elapsed_s': round(elapsed, 3),
+        'rows_written': sum(len(sheet['results']) for sheet in result['sheets']),
+        'jobs_by_node': {node: dict(processed[node]) for node in node_ids},
+        'affinity_ratio': round(affine / total, 3) if total else None,
+        'rate_violations': {
+            domain: rate_violations(times, coordinators[0].rate_for(domain), burst)
+            for domain, times in starts.items()
+        },
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nodes', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=30, help=f"Filas, repartidas entre {MARKETPLACES}")
+    parser.add_argument('--rate-per-minute', type=float, default=120, help="Scrapings por minuto y dominio")
+    parser.add_argument('--burst', type=float, default=2)
+    parser.add_argument('--fake-scrape', type=float, metavar='SEGUNDOS',
+                        help="No lanzar Chromium: cada producto tarda SEGUNDOS y devuelve reseñas sintéticas")
+    parser.add_argument('--output', help="Archivo JSON de salida (por defecto stdout)")
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    with FixtureServer() as server:
+        return await simulate(server, args.nodes, args.rows, args.rate_per_minute, args.burst, args.fake_scrape)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    report = asyncio.run(main(args))
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(payload)
+    else:
+        print(payload)
+    sys.exit(1 if any(report['rate_violations'].values()) else 0)
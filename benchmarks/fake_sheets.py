@@ -0,0 +1,213 @@
+"""
+Doble en memoria de gspread para correr GoogleDriveHandler sin red
+
+Se reemplaza solo el cliente de gspread: toda la lógica de ``GoogleDriveHandler``
+(armado de filas, manejo de hojas existentes, etc.) se ejecuta tal cual y cada
+llamada que en producción iría a la API de Sheets queda contada en ``calls``.
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import gspread
+
+from app.google_drive_handler import GoogleDriveHandler
+
+_A1_CELL = re.compile(r'^([A-Z]+)(\d+)?$')
+
+
+def _parse_cell(ref: str):
+    match = _A1_CELL.match(ref.upper())
+    if not match:
+        raise ValueError(f"Referencia A1 inválida: {ref}")
+    col = 0
+    for ch in match.group(1):
+        col = col * 26 + (ord(ch) - 64)
+    row = int(match.group(2)) if match.group(2) else None
+    return row, col
+
+
+def parse_a1_range(range_name: str):
+    """'B2:D10' -> (2, 2, 10, 4). Filas/columnas abiertas quedan en None"""
+    start, _, end = range_name.partition(':')
+    r1, c1 = _parse_cell(start)
+    r2, c2 = _parse_cell(end) if end else (r1, c1)
+    return r1 or 1, c1, r2, c2
+
+
+class FakeWorksheet:
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", title: str, rows: int = 1000, cols: int = 26,
+                 values: Optional[List[List[Any]]] = None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self._cells: List[List[str]] = [[str(v) for v in row] for row in (values or [])]
+        self.row_count = max(self.row_count, len(self._cells))
+
+    def _call(self, name: str):
+        self.spreadsheet.client.calls[name] += 1
+
+    # --- Lectura ---
+
+    def get_all_records(self) -> List[Dict[str, Any]]:
+        self._call('get_all_records')
+        if not self._cells:
+            return []
+        headers = self._cells[0]
+        return [
+            {h: (row[i] if i < len(row) else '') for i, h in enumerate(headers)}
+            for row in self._cells[1:]
+        ]
+
+    def get_all_values(self) -> List[List[str]]:
+        self._call('get_all_values')
+        return [list(row) for row in self._cells]
+
+    def row_values(self, row: int) -> List[str]:
+        self._call('row_values')
+        if row - 1 < len(self._cells):
+            values = list(self._cells[row - 1])
+            while values and values[-1] == '':
+                values.pop()
+            return values
+        return []
+
+    def get(self, range_name: str) -> List[List[str]]:
+        self._call('get')
+        r1, c1, r2, c2 = parse_a1_range(range_name)
+        r2 = min(r2 or len(self._cells), len(self._cells))
+        result = []
+        for row in self._cells[r1 - 1:r2]:
+            values = row[c1 - 1:c2] if c2 else row[c1 - 1:]
+            while values and values[-1] == '':
+                values = values[:-1]
+            result.append(list(values))
+        while result and not result[-1]:
+            result.pop()
+        return result
+
+    # --- Escritura ---
+
+    def update(self, range_name: str = 'A1', values: Optional[List[List[Any]]] = None, **kwargs):
+        self._call('update')
+        r1, c1, _, _ = parse_a1_range(range_name)
+        values = values or []
+        if r1 - 1 + len(values) > self.row_count:
+            raise gspread.exceptions.APIError(_FakeResponse(
+                400, f"Range ({self.title}!{range_name}) exceeds grid limits"
+            ))
+        for offset, row in enumerate(values):
+            target = r1 - 1 + offset
+            while len(self._cells) <= target:
+                self._cells.append([])
+            cells = self._cells[target]
+            needed = c1 - 1 + len(row)
+            if len(cells) < needed:
+                cells.extend([''] * (needed - len(cells)))
+            for j, value in enumerate(row):
+                cells[c1 - 1 + j] = '' if value is None else str(value)
+        return {'updatedRange': range_name, 'updatedRows': len(values)}
+
+    def append_rows(self, values: List[List[Any]], **kwargs):
+        self._call('append_rows')
+        self._cells.extend([[str(v) for v in row] for row in values])
+        self.row_count = max(self.row_count, len(self._cells))
+
+    def clear(self):
+        self._call('clear')
+        self._cells = []
+
+    def resize(self, rows: Optional[int] = None, cols: Optional[int] = None):
+        self._call('resize')
+        if rows is not None:
+            self.row_count = rows
+            del self._cells[rows:]
+        if cols is not None:
+            self.col_count = cols
+
+    def add_rows(self, rows: int):
+        self._call('add_rows')
+        self.row_count += rows
+
+    def format(self, ranges, fmt):
+        self._call('format')
+
+
+class FakeSpreadsheet:
+
+    def __init__(self, client: "FakeSheetsClient", title: str):
+        self.client = client
+        self.title = title
+        self._worksheets: Dict[str, FakeWorksheet] = {}
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.client.calls['worksheet'] += 1
+        if title not in self._worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        self.client.calls['worksheets'] += 1
+        return list(self._worksheets.values())
+
+    def add_worksheet(self, title: str, rows: int, cols: int, index: Optional[int] = None) -> FakeWorksheet:
+        self.client.calls['add_worksheet'] += 1
+        worksheet = FakeWorksheet(self, title, rows=rows, cols=cols)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def seed(self, title: str, values: List[List[Any]]) -> FakeWorksheet:
+        """Carga datos iniciales sin contar llamadas"""
+        worksheet = FakeWorksheet(self, title, rows=len(values) + 1, values=values)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+
+class FakeSheetsClient:
+    """Reemplazo de ``gspread.Client`` con contador de llamadas por método"""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self._spreadsheets: Dict[str, FakeSpreadsheet] = {}
+
+    def create(self, title: str) -> FakeSpreadsheet:
+        spreadsheet = FakeSpreadsheet(self, title)
+        self._spreadsheets[title] = spreadsheet
+        return spreadsheet
+
+    def open(self, title: str) -> FakeSpreadsheet:
+        self.calls['open'] += 1
+        if title not in self._spreadsheets:
+            raise gspread.exceptions.SpreadsheetNotFound(title)
+        return self._spreadsheets[title]
+
+    def reset_calls(self):
+        self.calls.clear()
+
+
+class FakeDriveHandler(GoogleDriveHandler):
+    """GoogleDriveHandler real respaldado por un FakeSheetsClient"""
+
+    def __init__(self, client: Optional[FakeSheetsClient] = None):
+        self._fake_client = client or FakeSheetsClient()
+        super().__init__(credentials_path='<memoria>')
+
+    def _authenticate(self):
+        self.gspread_client = self._fake_client
+
+    def test_connection(self) -> Dict[str, Any]:
+        return {'connected': True, 'files_found': len(self._fake_client._spreadsheets)}
+
+
+class _FakeResponse:
+    """Respuesta mínima para construir ``gspread.exceptions.APIError``"""
+
+    def __init__(self, code: int, message: str):
+        self.status_code = code
+        self._message = message
+        self.text = message
+
+    def json(self):
+        return {'error': {'code': self.status_code, 'message': self._message, 'status': 'INVALID_ARGUMENT'}}
@@ -0,0 +1,164 @@
+"""
+Servidor HTTP local que sirve páginas grabadas de Mercado Libre, Amazon y tiendas genéricas
+
+El marketplace se decide por el host (``*.localhost`` resuelve a 127.0.0.1 en Chromium
+sin tocar DNS), de modo que ``ReviewScraper._detect_marketplace`` elige la misma
+estrategia que en producción sin necesidad de red.
+"""
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from string import Template
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+HOSTS = {
+    'mercadolibre': 'articulo.mercadolibre.localhost',
+    'amazon': 'www.amazon.localhost',
+    'generic': 'tienda.localhost',
+}
+
+_FECHAS = [
+    "3 de mayo de 2024", "17 de enero de 2024", "28 de febrero de 2023",
+    "9 de noviembre de 2023", "1 de julio de 2024",
+]
+_TEXTOS = [
+    "Excelente producto, llegó antes de lo esperado y funciona tal como se describe.",
+    "La calidad es buena para el precio, aunque el empaque venía un poco dañado.",
+    "No cumplió mis expectativas, la batería dura bastante menos de lo anunciado.",
+    "Muy recomendable, ya es el segundo que compro y sigue funcionando perfecto.",
+    "Cumple, pero las instrucciones están solo en inglés y costó configurarlo.",
+]
+
+
+class FixtureSite:
+    """Renderiza las plantillas de ``fixtures/`` para un item dado"""
+
+    def __init__(self, reviews_per_page: int = 10, scroll_batches: int = 3, nav_links: int = 150):
+        self.reviews_per_page = reviews_per_page
+        self.scroll_batches = scroll_batches
+        self.nav_links = nav_links
+        self._templates: Dict[str, Template] = {
+            path.stem: Template(path.read_text(encoding="utf-8"))
+            for path in FIXTURES_DIR.glob("*.html")
+        }
+
+    def render(self, marketplace: str, path: str, query: Dict[str, list]) -> Optional[str]:
+        parts = [p for p in path.split('/') if p]
+        if marketplace == 'mercadolibre':
+            if parts and parts[0] == 'reviews' and len(parts) > 1:
+                return self._page('ml_reviews', parts[1], self._cards('ml_review_card', parts[1], 0))
+            if parts:
+                return self._page('ml_product', parts[0])
+        elif marketplace == 'amazon':
+            if len(parts) > 1 and parts[0] == 'product-reviews':
+                page = int(query.get('pageNumber', ['1'])[0])
+                return self._page('amazon_reviews', parts[1],
+                                  self._cards('amazon_review_card', parts[1], page), next_page=page + 1)
+            if len(parts) > 1 and parts[0] == 'dp':
+                return self._page('amazon_product', parts[1])
+        elif parts:
+            return self._page('generic_product', parts[-1], self._cards('generic_review_card', parts[-1], 0))
+        return None
+
+    def _page(self, name: str, item_id: str, reviews: str = "", next_page: int = 2) -> str:
+        links = "\n  ".join(
+            f'<a href="/categoria/{i}">Categoría {i}</a>' for i in range(self.nav_links)
+        )
+        return self._templates[name].safe_substitute(
+            title=f"Producto {item_id}",
+            item_id=item_id,
+            nav_links=links,
+            reviews=reviews,
+            next_page=next_page,
+            extra_batches=self.scroll_batches,
+            batch_size=self.reviews_per_page,
+        )
+
+    def _cards(self, name: str, item_id: str, page: int) -> str:
+        cards = []
+        for i in range(self.reviews_per_page):
+            seed = int(hashlib.md5(f"{item_id}-{page}-{i}".encode()).hexdigest(), 16)
+            rating = 1 + seed % 5
+            cards.append(self._templates[name].safe_substitute(
+                review_id=f"{item_id}{page}{i}",
+                author=f"Cliente {seed % 997}",
+                rating=f"{rating}.0",
+                stars=self._stars(rating, name),
+                review_title=f"Opinión {i + 1} sobre {item_id}",
+                date=_FECHAS[seed % len(_FECHAS)],
+                content=f"[{page}-{i}] {_TEXTOS[seed % len(_TEXTOS)]}",
+            ))
+        return "\n".join(cards)
+
+    @staticmethod
+    def _stars(rating: int, template: str) -> str:
+        if template.startswith('generic'):
+            return '★' * rating + '☆' * (5 - rating)
+        full = '<svg class="ui-review-capability-comments__comment__rating__star" fill="#3483fa"></svg>'
+        empty = '<svg class="ui-review-capability-comments__comment__rating__star" fill="#bfbfbf"></svg>'
+        return full * rating + empty * (5 - rating)
+
+
+class FixtureServer:
+    """Servidor en un hilo de fondo; usar como context manager"""
+
+    def __init__(self, site: Optional[FixtureSite] = None, host: str = "127.0.0.1", port: int = 0):
+        self.site = site or FixtureSite()
+        self.requests_served = 0
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                host = (self.headers.get('Host') or '').split(':')[0]
+                body = server.site.render(marketplace_for_host(host), parsed.path, parse_qs(parsed.query))
+                server.requests_served += 1
+                if body is None:
+                    self.send_error(404)
+                    return
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def url_for(self, marketplace: str, item_id: str) -> str:
+        host = f"http://{HOSTS[marketplace]}:{self.port}"
+        if marketplace == 'mercadolibre':
+            return f"{host}/MLA-{item_id}"
+        if marketplace == 'amazon':
+            # ASIN de 10 caracteres, para que canonicalize_url lo reconozca
+            return f"{host}/dp/B{item_id.zfill(9)[-9:]}"
+        return f"{host}/products/producto-{item_id}"
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def marketplace_for_host(host: str) -> str:
+    host = host.lower()
+    if 'mercadolibre' in host:
+        return 'mercadolibre'
+    if 'amazon' in host:
+        return 'amazon'
+    return 'generic'
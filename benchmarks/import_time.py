@@ -0,0 +1,97 @@
+"""
+Perfil de tiempo de importación de la API (``python -X importtime``)
+
+Mide cuánto tarda ``import app.main`` en un proceso limpio, lista los módulos más
+costosos y verifica que las dependencias pesadas (Selenium, BeautifulSoup, Google)
+no se carguen al importar la API, ya que se precalientan en segundo plano.
+
+Uso:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --max-ms 1500 --output import_time.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+# Módulos que no deben importarse al cargar app.main
+LAZY_MODULES = ['selenium', 'bs4', 'googleapiclient', 'gspread', 'google.oauth2', 'pandas', 'app.scraper']
+
+
+def profile_import(module: str = 'app.main', repeat: int = 3) -> Dict[str, Any]:
+    """Importa ``module`` en subprocesos nuevos y devuelve la mejor de ``repeat`` corridas"""
+    best: Optional[Dict[str, Any]] = None
+    for _ in range(repeat):
+        run = _profile_once(module)
+        if best is None or run['total_ms'] < best['total_ms']:
+            best = run
+    return best
+
+
+def _profile_once(module: str) -> Dict[str, Any]:
+    code = f"import sys, {module}; print(','.join(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        entries.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            # importtime indenta 2 espacios por nivel de anidamiento
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+        })
+
+    loaded = set(proc.stdout.strip().split(','))
+    target = next((e for e in entries if e['module'].strip() == module), None)
+    return {
+        'module': module,
+        'total_ms': round(target['cumulative_ms'] if target else sum(e['self_ms'] for e in entries), 1),
+        'modules_loaded': len(loaded),
+        'heavy_modules_loaded': [m for m in LAZY_MODULES if m in loaded],
+        # Importaciones directas de app.main: dónde se va el tiempo de arranque
+        'top_cumulative': _top([e for e in entries if e['depth'] == 1], 'cumulative_ms'),
+        'top_self': _top(entries, 'self_ms'),
+    }
+
+
+def _top(entries: List[Dict[str, Any]], key: str, limit: int = 15) -> List[Dict[str, Any]]:
+    return [
+        {'module': e['module'].strip(), key: round(e[key], 2)}
+        for e in sorted(entries, key=lambda e: e[key], reverse=True)[:limit]
+    ]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-ms', type=float, help="Falla (exit 1) si la importación supera este tiempo")
+    parser.add_argument('--output', help="Archivo JSON de salida (por defecto stdout)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = profile_import(args.module, args.repeat)
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(payload)
+    else:
+        print(payload)
+
+    problems = []
+    if report['heavy_modules_loaded']:
+        problems.append(f"módulos pesados importados al cargar {args.module}: {report['heavy_modules_loaded']}")
+    if args.max_ms is not None and report['total_ms'] > args.max_ms:
+        problems.append(f"importación de {report['total_ms']} ms supera el límite de {args.max_ms} ms")
+    for problem in problems:
+        print(f"❌ {problem}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,269 @@
+"""
+Benchmark offline de punta a punta de ``ReviewScraper.scrape_from_spreadsheet``
+
+Levanta el servidor de fixtures local, arma planillas en memoria de N filas y mide:
+filas/seg, latencias p50/p95 por etapa, RSS pico (proceso + Chromium) y llamadas
+a la API de Sheets. El resultado es JSON para comparar entre corridas.
+
+Uso (dentro del contenedor, sin red):
+    python -m benchmarks.run_pipeline --sizes 10 100 1000 --output bench.json
+    python -m benchmarks.run_pipeline --sizes 10 --baseline bench.json
+"""
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.memory_governor import process_tree_rss
+from app.scraper import ReviewScraper
+from benchmarks.fake_sheets import FakeDriveHandler, FakeSheetsClient
+from benchmarks.fixture_server import FixtureServer, FixtureSite
+
+DEFAULT_SIZES = [10, 100, 1000]
+MARKETPLACES = ['mercadolibre', 'amazon', 'generic']
+
+# Métodos instrumentados -> nombre de etapa en el reporte
+SCRAPER_STAGES = {
+    '_fetch_reviews': 'scrape_total',
+    '_navigate_ml': 'navigate',
+    '_navigate_amazon': 'navigate',
+    '_navigate_generic': 'navigate',
+    '_extract_review_html': 'extract_html',
+    '_parse_mercadolibre': 'parse',
+    '_parse_amazon': 'parse',
+    '_parse_generic': 'parse',
+}
+HANDLER_STAGES = {
+    'read_spreadsheet': 'sheets_read',
+    'iter_spreadsheet_rows': 'sheets_read',
+    'find_column_letter': 'sheets_read',
+    'save_reviews_to_new_sheet': 'sheets_write',
+    'update_cell': 'sheets_status',
+}
+
+
+class StageTimer:
+    """Acumula duraciones por etapa envolviendo métodos de una instancia"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def instrument(self, obj: Any, stages: Dict[str, str]):
+        for attr, stage in stages.items():
+            method = getattr(obj, attr, None)
+            if method is not None:
+                setattr(obj, attr, self._wrap(method, stage))
+
+    def _wrap(self, method, stage: str):
+        if inspect.isgeneratorfunction(method):
+            # Para lectores en streaming se mide el tiempo total dentro del generador
+            @functools.wraps(method)
+            def timed_gen(*args, **kwargs):
+                gen = method(*args, **kwargs)
+                spent = 0.0
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            item = next(gen)
+                        except StopIteration:
+                            break
+                        finally:
+                            spent += time.perf_counter() - start
+                        yield item
+                finally:
+                    self.samples[stage].append(spent)
+            return timed_gen
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    self.samples[stage].append(time.perf_counter() - start)
+            return timed_async
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                'count': len(values),
+                'p50_ms': round(_percentile(values, 50) * 1000, 2),
+                'p95_ms': round(_percentile(values, 95) * 1000, 2),
+                'total_s': round(sum(values), 3),
+            }
+            for stage, values in sorted(self.samples.items())
+        }
+
+
+class RssSampler:
+    """Muestrea en segundo plano el RSS del proceso y de sus hijos (chromedriver/Chromium)"""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_self = 0
+        self.peak_tree = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            own, tree = process_tree_rss(os.getpid())
+            self.peak_self = max(self.peak_self, own)
+            self.peak_tree = max(self.peak_tree, tree)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Percentil con interpolación lineal (0 si no hay muestras)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def build_sheet(client: FakeSheetsClient, server: FixtureServer, rows: int) -> str:
+    spreadsheet_name = f"Benchmark {rows} filas"
+    values = [['PRODUCTO', 'URL', 'ARCHIVOJSON']]
+    for i in range(rows):
+        marketplace = MARKETPLACES[i % len(MARKETPLACES)]
+        item_id = f"{rows:04d}{i:05d}"
+        values.append([f"Producto {marketplace} {i}", server.url_for(marketplace, item_id), ''])
+    client.create(spreadsheet_name).seed('Hoja1', values)
+    return spreadsheet_name
+
+
+async def run_size(server: FixtureServer, rows: int) -> Dict[str, Any]:
+    client = FakeSheetsClient()
+    spreadsheet_name = build_sheet(client, server, rows)
+
+    drive_handler = FakeDriveHandler(client)
+    scraper = ReviewScraper(drive_handler, delay_scale=0.0)
+    timer = StageTimer()
+    timer.instrument(scraper, SCRAPER_STAGES)
+    timer.instrument(drive_handler, HANDLER_STAGES)
+
+    first_result = []
+    store_row_result = scraper._store_row_result
+
+    def store_and_mark(*args, **kwargs):
+        if not first_result:
+            first_result.append(time.perf_counter())
+        return store_row_result(*args, **kwargs)
+    scraper._store_row_result = store_and_mark
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        result = await scraper.scrape_from_spreadsheet(spreadsheet_name, 'Hoja1')
+        elapsed = time.perf_counter() - start
+
+    reviews = sum(r.get('count', 0) for r in result.get('results', []))
+    return {
+        'rows': rows,
+        'elapsed_s': round(elapsed, 3),
+        'rows_per_sec': round(rows / elapsed, 3) if elapsed else None,
+        'time_to_first_result_s': round(first_result[0] - start, 3) if first_result else None,
+        'products_with_reviews': sum(1 for r in result.get('results', []) if r.get('count')),
+        'reviews_written': reviews,
+        'stages': timer.summary(),
+        'peak_rss_mb': {
+            'process': round(rss.peak_self / 2**20, 1),
+            'process_tree': round(rss.peak_tree / 2**20, 1),
+        },
+        'sheets_calls': {'total': sum(client.calls.values()), **dict(sorted(client.calls.items()))},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Líneas legibles con la variación relativa respecto a una corrida anterior"""
+    previous = {run['rows']: run for run in baseline.get('runs', [])}
+    lines = []
+    for run in current['runs']:
+        old = previous.get(run['rows'])
+        if not old:
+            continue
+        for label, new_value, old_value in [
+            ('rows/sec', run['rows_per_sec'], old['rows_per_sec']),
+            ('peak RSS tree MB', run['peak_rss_mb']['process_tree'], old['peak_rss_mb']['process_tree']),
+            ('sheets calls', run['sheets_calls']['total'], old['sheets_calls']['total']),
+        ]:
+            if old_value:
+                delta = (new_value - old_value) / old_value * 100
+                lines.append(f"{run['rows']:>5} filas | {label:<18} {old_value:>10} -> {new_value:>10} ({delta:+.1f}%)")
+    return lines
+
+
+async def main(sizes: List[int], reviews_per_page: int) -> Dict[str, Any]:
+    site = FixtureSite(reviews_per_page=reviews_per_page)
+    runs = []
+    with FixtureServer(site) as server:
+        for rows in sizes:
+            logger.warning(f"Benchmark: {rows} filas...")
+            runs.append(await run_size(server, rows))
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'reviews_per_page': reviews_per_page,
+        'runs': runs,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Filas por planilla")
+    parser.add_argument('--reviews-per-page', type=int, default=10)
+    parser.add_argument('--output', help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument('--baseline', help="JSON de una corrida anterior para comparar")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    report = asyncio.run(main(args.sizes, args.reviews_per_page))
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(payload)
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fh:
+            for line in compare(report, json.load(fh)):
+                print(line, file=sys.stderr)